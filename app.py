@@ -1,6 +1,8 @@
 #!/usr/bin/env python
+import mimetypes
 import os
-from flask import Flask, send_file
+import re
+from flask import Flask, send_file, request
 
 """
 flask run
@@ -12,24 +14,42 @@ app = Flask(__name__)
 root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs')
 root = os.environ.get('DIR', root)
 
+# Precompressed copies written by generate.py --compress, in order of preference
+encodings = [('br', '.br'), ('gzip', '.gz')]
+
+def send(path):
+    response = None
+    for encoding, suffix in encodings:
+        if request.accept_encodings[encoding] and os.path.exists(path + suffix):
+            response = send_file(path + suffix, mimetype=mimetypes.guess_type(path)[0])
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Vary'] = 'Accept-Encoding'
+            break
+    if response is None:
+        response = send_file(path)
+    # Static files with the hash of their content in their name never change
+    if re.search(r'\.[0-9a-f]{8}\.(js|css)$', path):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route("/")
 def main():
-    return send_file(os.path.join(root, 'index.html'))
+    return send(os.path.join(root, 'index.html'))
 
 @app.route("/<path:fullpath>")
 def all(fullpath):
-    extensions = ['.js', '.css', '.json', '.ico']
+    extensions = ['.js', '.css', '.json', '.ico', '.jpg', '.png', '.webp', '.xml', '.txt']
     for ext in extensions:
         if fullpath.endswith(ext):
             path = os.path.join(root, fullpath)
             if os.path.exists(path):
-                return send_file(path)
+                return send(path)
             else:
                 #print(f"No file {path}")
                 return '', 404
     if fullpath.endswith('/'):
         fullpath += 'index'
-    return send_file(os.path.join(root, f"{fullpath}.html"))
+    return send(os.path.join(root, f"{fullpath}.html"))
 
 if __name__ == "__main__":
     app.run(debug=True)
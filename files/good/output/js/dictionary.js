@@ -0,0 +1,32 @@
+$(document).ready(function(){
+    // Every letter of the dictionaries is a separate page, see dictionary_pages in ladino/export.py.
+    // When the reader scrolls to the link to the next letter, add the rows of that page to this one.
+    if (! ('IntersectionObserver' in window)) {
+        return;
+    }
+    let loading = false;
+    const observer = new IntersectionObserver(function(entries) {
+        const link = $('a.next-letter');
+        if (loading || link.length == 0 || ! entries.some(entry => entry.isIntersecting)) {
+            return;
+        }
+        loading = true;
+        $.get(link.attr('href'), function(html) {
+            const page = $(new DOMParser().parseFromString(html, 'text/html'));
+            $('table tbody').first().append(page.find('table tbody').first().children());
+            observer.unobserve(link[0]);
+            const next = page.find('a.next-letter');
+            if (next.length) {
+                link.replaceWith(next);
+                observer.observe(next[0]);
+            } else {
+                link.remove();
+            }
+        }).always(function() {
+            loading = false;
+        });
+    });
+    $('a.next-letter').each(function() {
+        observer.observe(this);
+    });
+});
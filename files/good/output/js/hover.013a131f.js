@@ -0,0 +1,29 @@
+$(document).ready(function(){
+    // The translations of the Ladino words linked on this page, see page_glosses in ladino/export.py
+    const element = document.getElementById('glosses');
+    if (! element) {
+        return;
+    }
+    const glosses = JSON.parse(element.textContent);
+
+    // The languages selected in the configuration of the converter
+    let languages = ['inglez', 'kasteyano', 'turko'];
+    const config_str = localStorage.getItem('config');
+    if (config_str) {
+        const lashon = JSON.parse(config_str)['lashon'];
+        languages = Object.keys(lashon).filter(language => lashon[language] == '1');
+    }
+
+    $('a[href^="/words/ladino/"]').each(function() {
+        const elem = $(this);
+        const gloss = glosses[elem.attr('href').substring('/words/ladino/'.length)];
+        if (! gloss) {
+            return;
+        }
+        let shown = languages.filter(language => gloss[language]);
+        if (shown.length == 0) {
+            shown = Object.keys(gloss);
+        }
+        elem.attr('title', shown.map(language => `${language}: ${gloss[language]}`).join("\n"));
+    });
+});
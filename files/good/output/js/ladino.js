@@ -131,4 +131,109 @@ function lookup(text, dictionary) {
     return rows;
 }
 
+// The shard of dictionary.json a word is in, see shard_prefix in ladino/export.py
+function shard_prefix(word) {
+    if (word == "") {
+        return "_";
+    }
+    const first = String.fromCodePoint(word.codePointAt(0));
+    if (/^[a-z0-9]$/.test(first)) {
+        return first;
+    }
+    return "u" + first.codePointAt(0).toString(16).padStart(4, "0");
+}
+
+// The shards needed to translate the words of the text from the given language.
+// The Ladino words they point to are in other shards, see ladino_shards.
+function source_shards(text, original_language, languages) {
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const words = cleaned.split(" ").filter(word => word != "").map(word => word.toLowerCase());
+    let sources;
+    if (original_language == "automatik") {
+        sources = ["ladino", "accented"].concat(languages.filter(language => language != "rashi"));
+    } else if (original_language == "ladino") {
+        sources = ["ladino", "accented"];
+    } else {
+        sources = [original_language];
+    }
+    let shards = [];
+    for (let ix = 0; ix < words.length; ix++) {
+        for (let jx = 0; jx < sources.length; jx++) {
+            shards.push([sources[jx], words[ix]]);
+        }
+    }
+    return shards;
+}
+
+// The Ladino shards of the translations found for the words, once the source shards are loaded.
+function ladino_shards(shards, dictionary) {
+    let needed = [];
+    for (let ix = 0; ix < shards.length; ix++) {
+        const [language, word] = shards[ix];
+        if (language == "ladino" || language == "accented" || ! dictionary[language]) {
+            continue;
+        }
+        const ladino_words = dictionary[language][word];
+        if (ladino_words) {
+            needed.push(["ladino", ladino_words[0]]);
+        }
+    }
+    return needed;
+}
+
+// The shards of the table of all the languages needed to translate the words of the text automatically.
+// The table is keyed by search_key, see search.js.
+function any_shards(text) {
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const words = cleaned.split(" ").filter(word => word != "");
+    return Array.from(new Set(words.map(word => search_key(word)))).map(key => ["any", key]);
+}
+
+// Copy the entries found in the loaded shards of the table of all the languages to the dictionary
+// of their language and return the Ladino shards of the translations, like ladino_shards.
+function expand_any(shards, dictionary, languages) {
+    let needed = [];
+    for (let ix = 0; ix < shards.length; ix++) {
+        const entries = dictionary["any"][shards[ix][1]] || [];
+        for (let jx = 0; jx < entries.length; jx++) {
+            const [language, word, ladino_words] = entries[jx];
+            if (language == "ladino") {
+                needed.push(["ladino", word]);
+                continue;
+            }
+            if (! dictionary[language]) {
+                dictionary[language] = {};
+            }
+            dictionary[language][word] = ladino_words;
+            if (language != "accented" && language != "rashi" && languages.includes(language)) {
+                needed.push(["ladino", ladino_words[0]]);
+            }
+        }
+    }
+    return needed;
+}
+
+// Update a copy of dictionary.json with a dictionary.patch.{from}-{to}.json
+function apply_patch(dictionary, patch) {
+    for (const language in patch["removed"]) {
+        for (const word of patch["removed"][language]) {
+            delete dictionary[language][word];
+        }
+    }
+    for (const key of ["added", "changed"]) {
+        for (const language in patch[key]) {
+            if (! dictionary[language]) {
+                dictionary[language] = {};
+            }
+            Object.assign(dictionary[language], patch[key][language]);
+        }
+    }
+    // keep the words in the order of dictionary.json
+    for (const language in dictionary) {
+        const words = Object.keys(dictionary[language]).sort();
+        dictionary[language] = Object.fromEntries(words.map(word => [word, dictionary[language][word]]));
+    }
+    return dictionary;
+}
+
 
@@ -90,7 +90,65 @@ $(document).ready(function(){
         }
     }
 
+    // Search-as-you-type in the navbar, see search.js
+    function search_as_you_type() {
+        const input = $('#search-input');
+        if (input.length == 0) {
+            return;
+        }
+        const results = $('#search-results');
+        const dropdown = $('#search-dropdown');
+        let manifest = null;
+        const shards = {};
+
+        function load_shard(prefix) {
+            if (! (prefix in shards)) {
+                shards[prefix] = Promise.resolve($.getJSON(`/search/${prefix}.json`));
+            }
+            return shards[prefix];
+        }
+
+        function show(text) {
+            const key = search_key(text.trim());
+            const prefix = search_shard(key, manifest['prefixes']);
+            if (prefix === null) {
+                dropdown.removeClass('is-active');
+                return;
+            }
+            load_shard(prefix).then(function(shard) {
+                if (search_key(input.val().trim()) != key) {
+                    return;
+                }
+                results.empty();
+                for (const [_, word, language, targets] of search_matches(shard, key, 20)) {
+                    for (const target of targets) {
+                        const label = language == 'ladino' ? word : `${word} (${language}): ${target}`;
+                        results.append($('<a class="dropdown-item">').attr('href', manifest['url'] + target).text(label));
+                    }
+                }
+                dropdown.toggleClass('is-active', results.children().length > 0);
+            });
+        }
+
+        input.on('input', function() {
+            if (manifest) {
+                show(input.val());
+                return;
+            }
+            $.getJSON('/search/manifest.json', function(data) {
+                manifest = data;
+                show(input.val());
+            });
+        });
+    }
+
   set_local_date();
   highlight();
+  search_as_you_type();
+
+  // Keep the converter and the pages visited for offline use, see ladino/sw.js
+  if ('serviceWorker' in navigator) {
+      navigator.serviceWorker.register('/sw.js');
+  }
 
 });
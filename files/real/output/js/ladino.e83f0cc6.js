@@ -0,0 +1,239 @@
+function translate(text, original_language, languages, dictionary) {
+    //console.log("translate from original_language:", original_language);
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const words = cleaned.split(" ");
+    let rows = [];
+    for (var ix = 0; ix < words.length; ix++) {
+        if (words[ix] == "") {
+            continue;
+        }
+        if (original_language == "automatik") {
+            rows.push( translate_word(words[ix], languages, dictionary) );
+        } else if (original_language == "ladino") {
+            //console.log("ladino");
+            rows.push( from_ladino(words[ix], dictionary) );
+        } else {
+            //console.log("language");
+            rows.push( from_language(original_language, words[ix], dictionary) );
+        }
+    }
+    return rows;
+}
+
+function translate_word(original_word, languages, dictionary) {
+    //console.log(word);
+    const word = original_word.toLowerCase();
+
+    let response = from_ladino(original_word, dictionary);
+    if (response["dictionary_word"]) {
+        return response;
+    }
+
+    let source_language = 'ladino';
+    let dictionary_word = '';
+    // console.log(`try '${word}' in translations`);
+    for (var jx=0; jx < languages.length; jx++) {
+        if (languages[jx] == "rashi") {
+            //console.log("skip rashi");
+            continue;
+        }
+        response = from_language(languages[jx], original_word, dictionary);
+        if (response["dictionary_word"]) {
+            return response;
+        }
+    }
+
+    //console.log('dictionary word', dictionary_word)
+    return {
+        'source_language': source_language,
+        'original_word': original_word,
+        'dictionary_word': '',
+        'word': word,
+        'ladino_from_source_language': ''
+    }
+}
+
+function from_language(source_language, original_word, dictionary) {
+    //console.log(`from_language: ${source_language} ${original_word}`);
+    const word = original_word.toLowerCase();
+    ladino_from_source_language = dictionary[source_language][word];
+    //console.log('ladino', ladino_from_source_language);
+    if (ladino_from_source_language) {
+        // TODO: shall we include the dictionary entry of all the words?
+        // TODO: should be select a different one not necessarily the first one?
+        let dictionary_word = dictionary['ladino'][ladino_from_source_language[0]];
+        if (dictionary_word) {
+            return {
+                'source_language': source_language,
+                'original_word': original_word,
+                'dictionary_word': dictionary_word,
+                'word': word,
+                'ladino_from_source_language': ladino_from_source_language
+            }
+        }
+    }
+    return {
+        'source_language': source_language,
+        'original_word': original_word,
+        'dictionary_word': '',
+        'word': word,
+        'ladino_from_source_language': ladino_from_source_language
+    }
+}
+
+function from_ladino(original_word, dictionary) {
+    //console.log(`from_ladino(${original_word}, ...)`);
+    const word = original_word.toLowerCase();
+    let dictionary_word = dictionary['ladino'][word];
+    let ladino_from_source_language = null;
+
+    if (! dictionary_word) {
+        // console.log(`try accented '${word}'`);
+        // console.log(dictionary["accented"]);
+        ladino_from_source_language = dictionary["accented"][word];
+        // console.log("ladino_from_source_language:", ladino_from_source_language);
+        if (ladino_from_source_language) {
+            dictionary_word = ladino_from_source_language[0];
+            // console.log(dictionary_word);
+        }
+    }
+    return {
+        'source_language': 'ladino',
+        'original_word': original_word,
+        'dictionary_word': dictionary_word,
+        'word': word,
+        'ladino_from_source_language': ladino_from_source_language,
+    }
+}
+
+
+function lookup(text, dictionary) {
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const ladino = Object.keys(dictionary["ladino"]);
+    //console.log(cleaned);
+
+    let source_language = 'ladino';
+    let rows = [];
+    for (let ix=0; ix < ladino.length; ix++) {
+        let ladino_word = ladino[ix];
+        if (ladino_word.includes(cleaned)) {
+            let dictionary_word = dictionary['ladino'][ladino_word];
+            rows.push(
+                {
+                    'source_language': source_language,
+                    'original_word': '',
+                    'dictionary_word': dictionary_word,
+                    'word': ladino_word
+                }
+            );
+        }
+    }
+    return rows;
+}
+
+// The shard of dictionary.json a word is in, see shard_prefix in ladino/export.py
+function shard_prefix(word) {
+    if (word == "") {
+        return "_";
+    }
+    const first = String.fromCodePoint(word.codePointAt(0));
+    if (/^[a-z0-9]$/.test(first)) {
+        return first;
+    }
+    return "u" + first.codePointAt(0).toString(16).padStart(4, "0");
+}
+
+// The shards needed to translate the words of the text from the given language.
+// The Ladino words they point to are in other shards, see ladino_shards.
+function source_shards(text, original_language, languages) {
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const words = cleaned.split(" ").filter(word => word != "").map(word => word.toLowerCase());
+    let sources;
+    if (original_language == "automatik") {
+        sources = ["ladino", "accented"].concat(languages.filter(language => language != "rashi"));
+    } else if (original_language == "ladino") {
+        sources = ["ladino", "accented"];
+    } else {
+        sources = [original_language];
+    }
+    let shards = [];
+    for (let ix = 0; ix < words.length; ix++) {
+        for (let jx = 0; jx < sources.length; jx++) {
+            shards.push([sources[jx], words[ix]]);
+        }
+    }
+    return shards;
+}
+
+// The Ladino shards of the translations found for the words, once the source shards are loaded.
+function ladino_shards(shards, dictionary) {
+    let needed = [];
+    for (let ix = 0; ix < shards.length; ix++) {
+        const [language, word] = shards[ix];
+        if (language == "ladino" || language == "accented" || ! dictionary[language]) {
+            continue;
+        }
+        const ladino_words = dictionary[language][word];
+        if (ladino_words) {
+            needed.push(["ladino", ladino_words[0]]);
+        }
+    }
+    return needed;
+}
+
+// The shards of the table of all the languages needed to translate the words of the text automatically.
+// The table is keyed by search_key, see search.js.
+function any_shards(text) {
+    const cleaned = text.replace(/[<>,;.:!?"'\n*()=\[\]\/\s]/g, " ");
+    const words = cleaned.split(" ").filter(word => word != "");
+    return Array.from(new Set(words.map(word => search_key(word)))).map(key => ["any", key]);
+}
+
+// Copy the entries found in the loaded shards of the table of all the languages to the dictionary
+// of their language and return the Ladino shards of the translations, like ladino_shards.
+function expand_any(shards, dictionary, languages) {
+    let needed = [];
+    for (let ix = 0; ix < shards.length; ix++) {
+        const entries = dictionary["any"][shards[ix][1]] || [];
+        for (let jx = 0; jx < entries.length; jx++) {
+            const [language, word, ladino_words] = entries[jx];
+            if (language == "ladino") {
+                needed.push(["ladino", word]);
+                continue;
+            }
+            if (! dictionary[language]) {
+                dictionary[language] = {};
+            }
+            dictionary[language][word] = ladino_words;
+            if (language != "accented" && language != "rashi" && languages.includes(language)) {
+                needed.push(["ladino", ladino_words[0]]);
+            }
+        }
+    }
+    return needed;
+}
+
+// Update a copy of dictionary.json with a dictionary.patch.{from}-{to}.json
+function apply_patch(dictionary, patch) {
+    for (const language in patch["removed"]) {
+        for (const word of patch["removed"][language]) {
+            delete dictionary[language][word];
+        }
+    }
+    for (const key of ["added", "changed"]) {
+        for (const language in patch[key]) {
+            if (! dictionary[language]) {
+                dictionary[language] = {};
+            }
+            Object.assign(dictionary[language], patch[key][language]);
+        }
+    }
+    // keep the words in the order of dictionary.json
+    for (const language in dictionary) {
+        const words = Object.keys(dictionary[language]).sort();
+        dictionary[language] = Object.fromEntries(words.map(word => [word, dictionary[language][word]]));
+    }
+    return dictionary;
+}
+
+
@@ -0,0 +1,26 @@
+// The prefix index of the words written by export_search_index in ladino/export.py, used by the search in all.js
+
+// Lower case without accents and other diacritics, the same as search_key in ladino/export.py
+function search_key(text) {
+    return text.toLowerCase().normalize('NFD').replace(/\p{Mn}/gu, '');
+}
+
+// The shard of the index a key is in, the same as search_prefix in ladino/export.py
+function search_prefix(key) {
+    const prefix = Array.from(key).slice(0, 2).map(char => /^[a-z0-9]$/.test(char) ? char : 'u' + char.codePointAt(0).toString(16).padStart(4, '0')).join('');
+    return prefix == '' ? '_' : prefix;
+}
+
+// The shard to look for the key in, or null if there is none.
+// A key of one character only finds the words of one character, they have shards of their own.
+function search_shard(key, prefixes) {
+    const prefix = search_prefix(key);
+    return key.length > 0 && prefixes.includes(prefix) ? prefix : null;
+}
+
+// The entries of a shard whose key starts with the key of the text, at most limit of them
+function search_matches(shard, text, limit) {
+    const key = search_key(text);
+    return shard.filter(entry => entry[0].startsWith(key)).slice(0, limit);
+}
+
@@ -5,4 +5,6 @@ time PYTHONPATH=. venv/bin/python ladino/generate.py  --html docs --all --log \
     --unafraza ../ladino-una-fraza-al-diya/    \
     --pages ../ladino-pages                    \
     --books ../ladino-salu-lulu/               \
-    --ladinadores ../ladino-los-ladinadores/
+    --ladinadores ../ladino-los-ladinadores/   \
+    --images                                   \
+    --dictionary-patches 5
@@ -0,0 +1,571 @@
+import ctypes
+import errno
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from jinja2 import meta
+
+# The state of the current build. Set by start() and used by the writers in ladino.export.
+html_path = None    # where the files are written, the staging directory of a full build
+target_path = None  # the html directory the build is for
+manifest = None
+is_incremental = False
+is_partial = False
+is_minified = False
+written = 0
+skipped = 0
+writer = None
+created_dirs = set()
+counter_lock = threading.Lock()
+
+writer_threads = 4
+max_pending_bytes = 64 * 1024 * 1024
+
+deploy_manifest = 'manifest.json'
+
+# Compressed copies written next to the files by ladino.compress
+sidecar_suffixes = ('.gz', '.br')
+
+# for renameat2, see swap_in_staging
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+code_digest = None
+template_cache = {}
+
+
+class BackgroundWriter():
+    """
+    Write files on a small pool of threads while the main thread keeps rendering.
+    At most max_pending_bytes of content wait to be written at any time.
+    Writes of the same file are done in the order they were submitted.
+    """
+    def __init__(self, threads, max_pending_bytes):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='writer')
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes = 0
+        self.condition = threading.Condition()
+        self.futures = {}  # full path -> the last write submitted for it
+
+    def submit(self, full_path, size, job):
+        with self.condition:
+            while self.pending_bytes > 0 and self.pending_bytes + size > self.max_pending_bytes:
+                self.condition.wait()
+            self.pending_bytes += size
+            previous = self.futures.get(full_path)
+            self.futures[full_path] = self.executor.submit(self.run, previous, size, job)
+
+    def run(self, previous, size, job):
+        try:
+            if previous is not None:
+                previous.result()
+            job()
+        finally:
+            with self.condition:
+                self.pending_bytes -= size
+                self.condition.notify_all()
+
+    def wait_for(self, full_path):
+        with self.condition:
+            future = self.futures.get(full_path)
+        if future is not None:
+            future.result()
+
+    def flush(self):
+        with self.condition:
+            futures = list(self.futures.values())
+            self.futures = {}
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+
+
+class BuildManifest():
+    """
+    Maps every generated file (relative to the html directory) to what it was made of:
+    {
+        "hash":      content hash of the file,
+        "inputs":    hash of the templates, the data and the code used to render it (incremental builds only),
+        "templates": {template name: content hash},
+        "sources":   [names of the yaml files of the words in the data] (incremental builds only),
+        "config":    [keys of the config that were passed to the template],
+        "size":      size of the file,
+        "mtime":     modification time of the file in nanoseconds,
+        "minified":  content hash of the file after minification, if it was minified,
+    }
+    """
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.previous = {}  # the outputs of the previous build
+        self.outputs = {}   # the outputs of this build
+        self.kept = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as fh:
+            data = json.load(fh)
+        if data.get('version') != self.version:
+            logging.info(f"Ignoring build manifest of version {data.get('version')}")
+            return
+        self.previous = data['outputs']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # json.dumps uses the C encoder, json.dump does not
+        with open(self.path, 'w') as fh:
+            fh.write(json.dumps({'version': self.version, 'outputs': self.outputs}, sort_keys=True))
+
+    def is_fresh(self, filename, inputs):
+        if not is_incremental:
+            return False
+        entry = self.previous.get(filename)
+        if entry is None or entry.get('inputs') != inputs:
+            return False
+        if 'minified' in entry and not is_minified:
+            return False
+        return os.path.exists(os.path.join(html_path, filename))
+
+    def keep(self, filename):
+        self.outputs[filename] = self.previous[filename]
+        self.kept += 1
+
+    def add(self, filename, content_hash, **dependencies):
+        entry = {'hash': content_hash}
+        entry.update({key: value for key, value in dependencies.items() if value})
+        self.outputs[filename] = entry
+
+    def orphans(self):
+        return sorted(set(self.previous.keys()) - set(self.outputs.keys()))
+
+
+def state_dir(html_dir):
+    """
+    The build state is kept next to the html directory so it is neither served nor deployed.
+    """
+    html_dir = os.path.abspath(html_dir)
+    return os.path.join(os.path.dirname(html_dir), f".{os.path.basename(html_dir)}.build")
+
+
+def staging_dir(html_dir):
+    html_dir = os.path.abspath(html_dir)
+    return os.path.join(os.path.dirname(html_dir), f".{os.path.basename(html_dir)}.staging")
+
+
+def start(html_dir, incremental=False, partial=False, minify=False):
+    """
+    An incremental build does not render again the pages whose inputs did not change.
+    A partial build only replaces some of the files of the previous build, it does not remove any.
+    A minified build is minified by ladino.minify before it is finished.
+
+    A full or incremental build is written to a staging directory next to html_dir that starts
+    as a copy (by hard links) of the current content. finish() swaps it with html_dir.
+    A partial build writes directly to html_dir, every file is replaced atomically.
+
+    Return the directory the files should be written to.
+    """
+    global html_path, target_path, manifest, is_incremental, is_partial, is_minified, written, skipped, writer
+    target_path = html_dir
+    if partial:
+        html_path = html_dir
+    else:
+        html_path = staging_dir(html_dir)
+        prepare_staging(html_dir, html_path)
+    is_incremental = incremental
+    is_partial = partial
+    is_minified = minify
+    written = 0
+    skipped = 0
+    created_dirs.clear()
+    if writer is not None:
+        writer.close()
+    writer = BackgroundWriter(writer_threads, max_pending_bytes)
+    manifest = BuildManifest(os.path.join(state_dir(html_dir), 'manifest.json'))
+    manifest.load()
+    logging.info(f"{len(manifest.previous)} files in the previous build")
+    if partial:
+        manifest.outputs = dict(manifest.previous)
+    return html_path
+
+
+def prepare_staging(html_dir, staging):
+    """
+    Make the staging directory a copy (by hard links) of html_dir.
+    The staging directory left by the previous build holds the content before it, so only the
+    files that changed since are linked again and the ones that are gone are removed.
+    """
+    if not os.path.isdir(html_dir):
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        return
+    os.makedirs(staging, exist_ok=True)
+    linked = sync_dir(html_dir, staging)
+    logging.info(f"Linked {linked} changed files to {staging}")
+
+
+def sync_dir(source_dir, target_dir):
+    existing = {entry.name: entry for entry in os.scandir(target_dir)}
+    linked = 0
+    for entry in os.scandir(source_dir):
+        target = os.path.join(target_dir, entry.name)
+        old = existing.pop(entry.name, None)
+        if entry.is_dir(follow_symlinks=False):
+            if old is not None and not old.is_dir(follow_symlinks=False):
+                os.remove(target)
+                old = None
+            if old is None:
+                os.mkdir(target)
+            linked += sync_dir(entry.path, target)
+            continue
+        if old is not None:
+            if not old.is_dir(follow_symlinks=False) and is_same_file(entry.stat(follow_symlinks=False), old.stat(follow_symlinks=False)):
+                continue
+            remove_path(target)
+        try:
+            os.link(entry.path, target)
+        except OSError:
+            shutil.copy2(entry.path, target)
+        linked += 1
+    for old in existing.values():
+        remove_path(old.path)
+    return linked
+
+
+def is_same_file(source, target):
+    # a copy made by shutil.copy2 when hard links are not possible keeps the size and the mtime
+    return (source.st_ino, source.st_dev) == (target.st_ino, target.st_dev) or (source.st_size, source.st_mtime_ns) == (target.st_size, target.st_mtime_ns)
+
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def exchange_paths(path, other):
+    """
+    Swap two paths in a single step with renameat2(RENAME_EXCHANGE).
+    Return False if the system or the file system does not support it.
+    """
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    if renameat2(AT_FDCWD, os.fsencode(path), AT_FDCWD, os.fsencode(other), RENAME_EXCHANGE) == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), path)
+
+
+def swap_in_staging():
+    """
+    Put the staging directory in place of the html directory, and the old content in the staging
+    directory, where the next build starts from it.
+    Where renameat2 can exchange the two directories (Linux) someone reading html_dir sees either
+    the old or the new content, never a partial one. Elsewhere the two directories are renamed
+    one after the other and html_dir is missing for a moment.
+    """
+    if os.path.exists(target_path) and exchange_paths(html_path, target_path):
+        logging.info(f"Exchanged {html_path} and {target_path}")
+        return
+    old_path = None
+    if os.path.exists(target_path):
+        old_path = os.path.join(os.path.dirname(html_path), f".{os.path.basename(os.path.abspath(target_path))}.old.{os.getpid()}")
+        os.rename(target_path, old_path)
+    os.rename(html_path, target_path)
+    logging.info(f"Moved {html_path} to {target_path}")
+    if old_path is not None:
+        os.rename(old_path, html_path)
+
+
+def flush():
+    """
+    Wait for all the files given to write() to be on the disk.
+    """
+    if writer is not None:
+        writer.flush()
+
+
+def finish():
+    global writer
+    writer.close()
+    writer = None
+    logging.info(f"Build has {len(manifest.outputs)} files, {manifest.kept} of them were up to date")
+    logging.info(f"Wrote {written} files, skipped {skipped} unchanged files")
+    write_deploy_manifest()
+    if not is_partial:
+        remove_stale_files()
+        swap_in_staging()
+    manifest.save()
+
+
+def write_deploy_manifest():
+    """
+    manifest.json in the html directory maps every file to the hash of its content,
+    so a deploy can upload only the files that changed.
+    """
+    hashes = {filename: entry.get('minified', entry['hash']) for filename, entry in manifest.outputs.items() if filename != deploy_manifest}
+    data = json.dumps(hashes, indent=4, sort_keys=True).encode('utf-8')
+    write_bytes(deploy_manifest, os.path.join(html_path, deploy_manifest), data, hashlib.sha256(data).hexdigest(), {})
+
+
+def remove_stale_files():
+    """
+    Remove every file in the html directory that was not generated by this build.
+    """
+    for dir_path, _, filenames in os.walk(html_path, topdown=False):
+        for filename in filenames:
+            full_path = os.path.join(dir_path, filename)
+            if os.path.relpath(full_path, html_path) not in manifest.outputs:
+                logging.info(f"Remove stale file {full_path}")
+                os.remove(full_path)
+                remove_empty_dirs(dir_path)
+
+
+def remove_empty_dirs(dir_path):
+    root = os.path.abspath(html_path)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root and dir_path.startswith(root) and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_unchanged(filename, full_path, content_hash):
+    """
+    Compare with the hash in the manifest of the previous build, if the file was not touched since,
+    or with the file itself.
+    """
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        return False
+    entry = manifest.previous.get(filename) if manifest is not None else None
+    # A minified file is kept only by a minified build, it is minified again if it changed.
+    if entry is not None and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime_ns and ('minified' not in entry or is_minified):
+        return entry['hash'] == content_hash
+    return file_hash(full_path) == content_hash
+
+
+def ensure_dir(dir_path):
+    if dir_path not in created_dirs:
+        os.makedirs(dir_path, exist_ok=True)
+        created_dirs.add(dir_path)
+
+
+def count(changed):
+    global written, skipped
+    with counter_lock:
+        if changed:
+            written += 1
+        else:
+            skipped += 1
+
+
+def write(filename, content, **dependencies):
+    """
+    Write the content (a string or an iterable of strings) to filename relative to the html directory
+    and record it in the manifest. Files whose content did not change are left alone, so they keep
+    their modification time. Return the hash of the content.
+
+    Strings are written in the background, call flush() to wait for them.
+    Streamed content is written right away, chunk by chunk.
+    """
+    full_path = os.path.join(html_path, filename)
+    if isinstance(content, list):
+        content = ''.join(content)
+
+    if isinstance(content, str):
+        data = content.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        job = lambda: write_bytes(filename, full_path, data, content_hash, dependencies)
+        if writer is None:
+            job()
+        else:
+            writer.submit(full_path, len(data), job)
+        return content_hash
+
+    # Streamed content is written to a temporary file and only moved in place if it changed.
+    if writer is not None:
+        writer.wait_for(full_path)
+    ensure_dir(os.path.dirname(full_path))
+    temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    digest = hashlib.sha256()
+    with open(temp_path, "wb") as fh:
+        for chunk in content:
+            data = chunk.encode('utf-8')
+            digest.update(data)
+            fh.write(data)
+    content_hash = digest.hexdigest()
+    changed = not is_unchanged(filename, full_path, content_hash)
+    if changed:
+        os.replace(temp_path, full_path)
+    else:
+        os.remove(temp_path)
+    record(filename, full_path, content_hash, changed, dependencies)
+    return content_hash
+
+
+def write_bytes(filename, full_path, data, content_hash, dependencies):
+    changed = not is_unchanged(filename, full_path, content_hash)
+    if changed:
+        ensure_dir(os.path.dirname(full_path))
+        temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(temp_path, full_path)
+    record(filename, full_path, content_hash, changed, dependencies)
+
+
+def record(filename, full_path, content_hash, changed, dependencies):
+    count(changed)
+    if changed:
+        drop_sidecars(filename, full_path)
+    if manifest is not None:
+        stat = os.stat(full_path)
+        manifest.add(filename, content_hash, size=stat.st_size, mtime=stat.st_mtime_ns, **dependencies)
+
+
+def remove(filename):
+    """
+    Remove a file of the previous build that is not generated any more, in a partial build.
+    """
+    full_path = os.path.join(html_path, filename)
+    if os.path.exists(full_path):
+        os.remove(full_path)
+    drop_sidecars(filename, full_path)
+    manifest.outputs.pop(filename, None)
+
+
+def drop_sidecars(filename, full_path):
+    """
+    Remove the compressed copies of a file that was written again, they have the old content.
+    """
+    for suffix in sidecar_suffixes:
+        if os.path.exists(full_path + suffix):
+            os.remove(full_path + suffix)
+        if manifest is not None:
+            manifest.outputs.pop(filename + suffix, None)
+
+
+def get_code_digest():
+    global code_digest
+    if code_digest is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(root, '**', '*.py'), recursive=True)):
+            with open(path, 'rb') as fh:
+                digest.update(fh.read())
+        code_digest = digest.hexdigest()
+    return code_digest
+
+
+def template_hashes(env, name, hashes=None):
+    """
+    Content hash of the template and of every template it includes or extends.
+    """
+    if hashes is None:
+        if name not in template_cache:
+            template_cache[name] = template_hashes(env, name, {})
+        return template_cache[name]
+    if name in hashes:
+        return hashes
+    source, _, _ = env.loader.get_source(env, name)
+    hashes[name] = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    for included in meta.find_referenced_templates(env.parse(source)):
+        if included is not None:
+            template_hashes(env, included, hashes)
+    return hashes
+
+
+class DataHasher():
+    """
+    Hash nested mappings, lists, sets and strings piece by piece, without making a copy of them.
+    Anything else (numbers, None, dates) is hashed by its repr. Also collect the yaml files named
+    by 'source' keys.
+    """
+    buffer_size = 64 * 1024
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.parts = []
+        self.size = 0
+        self.sources = set()
+
+    def add(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.digest.update(''.join(self.parts).encode('utf-8', 'surrogatepass'))
+        self.parts = []
+        self.size = 0
+
+    def feed(self, data):
+        if isinstance(data, str):
+            self.add(f"s{len(data)}:")
+            self.add(data)
+        elif isinstance(data, Mapping):
+            self.add(f"d{len(data)}:")
+            source = data.get('source')
+            if isinstance(source, str) and source.endswith('.yaml'):
+                self.sources.add(source)
+            for key, value in data.items():
+                self.feed(key)
+                self.feed(value)
+        elif isinstance(data, (list, tuple)):
+            self.add(f"l{len(data)}:")
+            for value in data:
+                self.feed(value)
+        elif isinstance(data, (set, frozenset)):
+            # in a stable order, the order of a set depends on PYTHONHASHSEED
+            self.add(f"e{len(data)}:")
+            for value in sorted(data, key=repr):
+                self.feed(value)
+        else:
+            text = repr(data)
+            self.add(f"r{len(text)}:")
+            self.add(text)
+
+    def hexdigest(self):
+        self.flush()
+        return self.digest.hexdigest()
+
+
+def fingerprint(filename, templates, args):
+    """
+    Hash of everything a page is rendered from, and the yaml files of the words that went into it.
+    Only needed by incremental builds.
+    """
+    hasher = DataHasher()
+    hasher.add(get_code_digest())
+    hasher.feed(filename)
+    hasher.feed(json.dumps(templates, sort_keys=True))
+    hasher.feed(sorted(args.items(), key=lambda pair: pair[0]))
+    return hasher.hexdigest(), sorted(hasher.sources)
@@ -4,6 +4,11 @@ import logging
 class LadinoError(Exception):
     pass
 
+# The time of the build shown on the pages. Set by ladino.generate.
+start = None
+# In a reproducible build the same input always creates the same files.
+reproducible = False
+
 languages = ['inglez', 'fransez', 'ebreo', 'kasteyano', 'turko', 'portugez']
 
 def words_to_url(words):
@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import ladino.build as build
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+extensions = ('.html', '.json', '.js', '.css', '.txt', '.xml')
+min_size = 1024
+
+def gzip_data(data):
+    # mtime=0 so the same content always gives the same file
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def brotli_data(data):
+    return brotli.compress(data, quality=11)
+
+def encoders():
+    found = [('.gz', gzip_data)]
+    if brotli is not None:
+        found.append(('.br', brotli_data))
+    return found
+
+def compress_file(filename, source_hash, suffix, encoder):
+    full_path = os.path.join(build.html_path, filename)
+    with open(full_path, 'rb') as fh:
+        data = encoder(fh.read())
+    sidecar = filename + suffix
+    build.write_bytes(sidecar, full_path + suffix, data, hashlib.sha256(data).hexdigest(), {'source': source_hash})
+    return os.path.getsize(full_path) - len(data)
+
+def compress_outputs(threads=None):
+    """
+    Write a .gz (and a .br if the brotli module is installed) next to every generated
+    text file that is at least min_size bytes. A sidecar is only created again if the
+    file it was made from changed.
+    """
+    logging.info("Compress the generated files")
+    build.flush()
+    jobs = []
+    for filename, entry in sorted(build.manifest.outputs.items()):
+        if not filename.endswith(extensions) or entry.get('size', 0) < min_size:
+            continue
+        for suffix, encoder in encoders():
+            sidecar = filename + suffix
+            previous = build.manifest.previous.get(sidecar)
+            # The file on the disk, minified or not
+            source_hash = entry.get('minified', entry['hash'])
+            if previous is not None and previous.get('source') == source_hash and os.path.exists(os.path.join(build.html_path, sidecar)):
+                build.manifest.outputs[sidecar] = previous
+                continue
+            jobs.append((filename, source_hash, suffix, encoder))
+
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as executor:
+        saved = sum(executor.map(lambda job: compress_file(*job), jobs))
+    logging.info(f"Compressed {len(jobs)} files, saved {saved} bytes")
@@ -1,24 +1,30 @@
-import copy
+import collections
 import logging
 import os
-import glob
 import json
-import shutil
 import re
 import datetime
+import functools
+import hashlib
+import heapq
 import sys
+import types
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from yaml import safe_load
 
 import markdown
 from jinja2 import Environment, FileSystemLoader
 
-from ladino.common import languages
+from ladino.common import languages, LadinoError
 import ladino.common
+import ladino.build as build
 from ladino.export_to_hunspell import export_to_hunspell
 from ladino.pdf import create_pdf_dictionaries
 import ladino.whatsapeando as whatsapp
 from ladino.ufad import load_ufad
 from ladino.ladinadores import load_ladinadores
+from ladino.images import export_images
 from ladino.videos import load_videos
 
 language_codes = {
@@ -32,6 +38,64 @@ language_codes = {
 
 
 html_path = None
+site_config = None
+glossary = {} # the translations of the Ladino words for the tooltips, see page_glosses
+environment = None
+render_only = None # when set, only these files are written
+
+# The static files and their content-hashed names, e.g. 'js/ladino.js' => 'js/ladino.3f9a1c2b.js'
+assets = {}
+asset_hash_length = 8
+
+# Pages that can hold a large part of the dictionary or corpus. They are streamed to disk
+# in buffered chunks instead of being built as one string in memory.
+streamed_pages = {
+    re.compile(r'^words/ladino/index\.html$'),
+    re.compile(r'^egzempios/index\.html$'),
+}
+stream_buffer_size = 100
+
+# The "similar words" of the word pages, see similar_words
+similar_count = 5
+similar_ngram = 3
+similar_min_score = 0.4
+similar_max_postings = 1000
+
+# The pages and data files the service worker keeps for offline use, besides the static assets,
+# see export_service_worker. dictionary.json and its shards are only cached when they are used,
+# so a first visit does not download the whole dictionary and a new version comes as a patch.
+precache_files = [
+    'index.html',
+    'dictionary/manifest.json',
+    'search/manifest.json',
+    'verbos/index.html',
+    'verbos/conjugations/manifest.json',
+]
+
+# The listing pages (words, examples, whatsapeando, ufad) show at most listing_page_size entries each,
+# the rest are on numbered pages, see paginate
+listing_page_size = 500
+# The word pages link to at most word_reference_limit examples and texts of every source,
+# see export_dictionary_pages
+word_reference_limit = 20
+
+# dictionary.json and count.json are encoded json_block_size entries of the second level
+# at a time and written in blocks of json_buffer_size characters.
+json_stream_depth = 2
+json_block_size = 1000
+json_buffer_size = 64 * 1024
+json_encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+json_pretty_encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True, indent=4)
+
+# The size of the shards of the conjugation bundle, see export_conjugation_bundle
+verb_shard_size = 64 * 1024
+
+site_url = 'https://kantoniko.com/'
+# A sitemap file may not list more than 50,000 urls
+sitemap_limit = 50000
+sitemap_header = '''<?xml version="1.0" encoding="UTF-8"?>
+<{} xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9 http://www.sitemaps.org/schemas/sitemap/0.9/{}.xsd" xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+'''
 
 accents = {
     'á': 'a',
@@ -49,31 +113,210 @@ def deaccent(text):
     return text
 
 
+def is_streamed(filename):
+    return any(regex.search(filename) for regex in streamed_pages)
+
+
+def get_environment():
+    global environment
+    if environment is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        templates_dir = os.path.join(root, "templates")
+        environment = Environment(loader=FileSystemLoader(templates_dir), autoescape=True)
+        environment.filters["yaml2html"] = lambda path: re.sub(r"\.yaml$", ".html", path)
+        environment.globals["asset"] = asset_url
+        # tojson still escapes <, >, & and ' so the data is safe inside a script element
+        environment.policies["json.dumps_kwargs"] = {"sort_keys": True, "ensure_ascii": False, "separators": (",", ":")}
+    return environment
+
+def asset_url(path):
+    return "/" + assets.get(path, path)
+
+def config_keys(args):
+    if site_config is None:
+        return []
+    keys = set()
+    for value in args.values():
+        if value is site_config:
+            keys.update(site_config.keys())
+        for key, config_value in site_config.items():
+            if value is config_value:
+                keys.add(key)
+    return sorted(keys)
+
 def render(template, filename=None, **args):
-    root = os.path.dirname(os.path.abspath(__file__))
-    templates_dir = os.path.join(root, "templates")
-    env = Environment(loader=FileSystemLoader(templates_dir), autoescape=True)
-    env.filters["yaml2html"] = lambda path: re.sub(r"\.yaml$", ".html", path)
+    job = render_job(template, filename, args)
+    if job is None:
+        return
+    html_template, lang, dependencies = job
+
+    if is_streamed(filename):
+        stream = html_template.stream(**args, lang=lang)
+        stream.enable_buffering(size=stream_buffer_size)
+        content = stream
+    else:
+        content = html_template.render(**args, lang=lang)
+    build.write(filename, content, **dependencies)
+
+def render_job(template, filename, args):
+    """
+    Add the page to the sitemap and check if it has to be rendered again.
+    Return the template, the language of the page and the dependencies to record in the
+    build manifest, or None if the page is not needed or is up to date.
+    """
+    if render_only is not None and filename not in render_only:
+        return
+    env = get_environment()
     html_template = env.get_template(template)
     lang = "lad"
     if filename.startswith("en/"):
         lang = "en"
     if filename.startswith("he/"):
         lang = "he"
-    html = html_template.render(**args, lang=lang)
 
-    full_path = os.path.join(html_path, filename)
-    dir_path = os.path.dirname(full_path)
-    os.makedirs(dir_path, exist_ok=True)
-
-    with open(full_path, "w") as fh:
-        fh.write(html)
     if filename.endswith('index.html'):
         sitemap.add(filename[0:-10])
     elif filename.endswith('.html'):
         sitemap.add(filename[0:-5])
 
-def export_dictionary_pages(pages, word_to_examples, word_to_whatsapp, word_to_una_fraza, word_to_afish, html_dir):
+    templates = build.template_hashes(env, template)
+    # A targeted build renders all its pages, fingerprinting the large ones would take longer.
+    if not build.is_incremental or build.is_partial:
+        return html_template, lang, dict(templates=templates, config=config_keys(args))
+    inputs, sources = build.fingerprint(filename, templates, dict(args, lang=lang, assets=assets))
+    if build.manifest.is_fresh(filename, inputs):
+        build.manifest.keep(filename)
+        return
+    return html_template, lang, dict(inputs=inputs, templates=templates, sources=sources, config=config_keys(args))
+
+def render_pages(pages, processes=None):
+    """
+    Render (template, filename, args) pages on a pool of processes and write them.
+    The pages are rendered to strings, they are not streamed.
+    """
+    jobs = []
+    for template, filename, args in pages:
+        job = render_job(template, filename, args)
+        if job is not None:
+            jobs.append((template, filename, args, job[1], job[2]))
+    if not jobs:
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=set_assets, initargs=(assets,)) as executor:
+        contents = executor.map(render_string, [(template, args, lang) for template, _, args, lang, _ in jobs], chunksize=4)
+        for (_, filename, _, _, dependencies), content in zip(jobs, contents):
+            build.write(filename, content, **dependencies)
+
+def set_assets(names):
+    # The worker processes may not share the memory of the build
+    global assets
+    assets = dict(names)
+
+def render_string(job):
+    template, args, lang = job
+    return get_environment().get_template(template).render(**args, lang=lang)
+
+def page_url(filename):
+    if filename.endswith('index.html'):
+        return '/' + filename[0:-10]
+    return '/' + filename[0:-5]
+
+def paginate(filename, items, label):
+    """
+    Split the items of the listing page filename (X.html or X/index.html) to pages of at most
+    listing_page_size items. The first page keeps the filename, the others are X/pajina/N.html.
+    If there is more than one page, X/pajina/index.json lists them with the label of their first
+    and last item, so pagination.js can offer to jump to any of them.
+    Return a list of (filename, items, pagination).
+    """
+    base = filename[0:-10] if filename.endswith('index.html') else filename[0:-5] + '/'
+    chunks = [items[start:start + listing_page_size] for start in range(0, len(items), listing_page_size)] or [items]
+    filenames = [filename] + [f"{base}pajina/{number}.html" for number in range(2, len(chunks) + 1)]
+    index_file = f"{base}pajina/index.json"
+    if render_only is not None and filename in render_only:
+        render_only.update(filenames)
+        render_only.add(index_file)
+
+    urls = [page_url(name) for name in filenames]
+    if len(chunks) > 1:
+        index = [{'url': url, 'first': label(chunk[0]), 'last': label(chunk[-1]), 'count': len(chunk)} for url, chunk in zip(urls, chunks)]
+        export_json({'pages': index}, os.path.join(html_path, index_file))
+
+    pages = []
+    for number, (name, chunk) in enumerate(zip(filenames, chunks), start=1):
+        pages.append((name, chunk, pagination_view(urls, number, '/' + index_file if len(chunks) > 1 else None)))
+    return pages
+
+def pagination_view(urls, number, index=None):
+    """
+    The links of page number (counted from 1) among the pages at urls, for incl/pagination.html.
+    """
+    # The first, the last and the two pages on each side of the current one
+    shown = sorted({1, len(urls)} | set(range(max(1, number - 2), min(len(urls), number + 2) + 1)))
+    return {
+        'number': number,
+        'count': len(urls),
+        'prev': urls[number - 2] if number > 1 else None,
+        'next': urls[number] if number < len(urls) else None,
+        'pages': [{'number': shown_number, 'url': urls[shown_number - 1], 'gap': idx > 0 and shown_number - shown[idx - 1] > 1} for idx, shown_number in enumerate(shown)],
+        'index': index,
+    }
+
+def word_references(plain_word, examples, whatsapp, ufad, afishes):
+    """
+    The links from a word page to the examples and the texts of the corpus the word appears in,
+    as a list of (name, title, links). The links of every source are ranked shortest text first.
+    """
+    sources = [
+        ('egzempios', 'Egzempios', [(f"/egzempios/{example['url']}", example['ladino']) for example in examples]),
+        ('whatsapeando', 'Estamos Whatsapeando', [(f"/whatsapeando/{url.lower()}?highlight={plain_word}", text) for url, text in whatsapp.items()]),
+        ('ufad', 'Una fraza', [(f"/ufad/{url.lower()}?highlight={plain_word}", text) for url, text in ufad.items()]),
+        ('afishes', 'Afishes', [(f"/afishes/{url.lower()}", text) for url, text in afishes.items()]),
+    ]
+    references = []
+    for name, title, links in sources:
+        if links:
+            ranked = sorted(links, key=lambda link: (len(link[1]), link[1], link[0]))
+            references.append((name, title, [{'url': url, 'text': text} for url, text in ranked]))
+    return references
+
+def ngrams(key):
+    """
+    The character n-grams of a word, with its beginning and end marked.
+    """
+    padded = f"^{key}$"
+    return {padded[start:start + similar_ngram] for start in range(max(1, len(padded) - similar_ngram + 1))}
+
+def similar_words(words):
+    """
+    Map every word to the similar_count most similar other words, by the Dice coefficient of their
+    character n-grams. The candidates of a word are collected from an inverted index from the n-grams
+    to the words. N-grams that appear in more than similar_max_postings words are left out of the
+    collection, so the time grows about linearly with the number of words.
+    """
+    words = sorted(words)
+    grams = [ngrams(search_key(word)) for word in words]
+    index = collections.defaultdict(list)
+    for idx, word_grams in enumerate(grams):
+        for gram in word_grams:
+            index[gram].append(idx)
+
+    similar = {}
+    for idx, word_grams in enumerate(grams):
+        shared = collections.Counter()
+        for gram in word_grams:
+            if len(index[gram]) <= similar_max_postings:
+                shared.update(index[gram])
+        scored = []
+        for other, common in shared.items():
+            score = 2 * common / (len(word_grams) + len(grams[other]))
+            if other != idx and score >= similar_min_score:
+                scored.append((-score, words[other]))
+        if scored:
+            similar[words[idx]] = [word for _, word in heapq.nsmallest(similar_count, scored)]
+    return similar
+
+def export_dictionary_pages(pages, word_to_examples, word_to_whatsapp, word_to_una_fraza, word_to_afish, html_dir, similar=None):
     logging.info("export_dictionary_pages")
     words_dir = os.path.join(html_dir, 'words')
     os.makedirs(words_dir, exist_ok=True)
@@ -86,20 +329,53 @@ def export_dictionary_pages(pages, word_to_examples, word_to_whatsapp, word_to_u
     logging.info(f"Export one page for every word for {language} to {language_dir}")
     os.makedirs(language_dir, exist_ok=True)
     for plain_word, data in words.items():
-        filename = f'{plain_word}.html'
+        filename = os.path.join('words', language, f'{plain_word}.html')
         logging.info(f"Export to {filename}")
+        references = word_references(
+            plain_word,
+            word_to_examples.get(plain_word, []),
+            word_to_whatsapp.get(plain_word, {}),
+            word_to_una_fraza.get(plain_word, {}),
+            word_to_afish.get(plain_word, {}),
+        )
+
+        # Only the first word_reference_limit links of every source are on the page of the word,
+        # the rest are on the pages words/ladino/{word}/{source}-2.html, -3.html...
+        shown = []
+        for name, title, links in references:
+            overflow = links[word_reference_limit:]
+            chunks = [overflow[start:start + listing_page_size] for start in range(0, len(overflow), listing_page_size)]
+            filenames = [os.path.join('words', language, plain_word, f'{name}-{number}.html') for number in range(2, len(chunks) + 2)]
+            if render_only is not None and filename in render_only:
+                render_only.update(filenames)
+            urls = [page_url(filename)] + [page_url(overflow_file) for overflow_file in filenames]
+            for number, (overflow_file, chunk) in enumerate(zip(filenames, chunks), start=2):
+                render(
+                    template="word_references.html",
+                    filename=overflow_file,
+
+                    title=f"{plain_word} - {title}",
+                    plain_word=plain_word,
+                    links=chunk,
+                    pagination=pagination_view(urls, number),
+                )
+            shown.append({
+                'title': title,
+                'links': links[0:word_reference_limit],
+                'more': len(overflow),
+                'next': urls[1] if chunks else None,
+            })
+
         render(
             template="word.html",
-            filename=os.path.join('words', language, filename),
+            filename=filename,
 
-            data=copy.deepcopy(data),
+            data=data,
             title=f"{plain_word}",
             plain_word=plain_word,
             language_codes=language_codes,
-            whatsapp=word_to_whatsapp.get(plain_word, {}),
-            afishes=word_to_afish.get(plain_word, {}),
-            ufad=word_to_una_fraza.get(plain_word, {}),
-            examples=sorted(word_to_examples.get(plain_word, {}), key=lambda ex: ex['ladino']),
+            references=shown,
+            similar=(similar or {}).get(plain_word, []),
         )
 
         export_json(data, os.path.join(words_dir, language, f'{plain_word}.json'))
@@ -116,18 +392,23 @@ def export_dictionary_lists(pages, word_to_examples, word_to_whatsapp, word_to_u
             total[word] += len(things.get(word, []))
 
     os.makedirs(os.path.join(words_dir, language), exist_ok=True)
-    render(
-        template="ladino_words.html",
-        filename=os.path.join('words', language, 'index.html'),
-
-        title=f"{language}",
-        words=words,
-        examples=word_to_examples,
-        whatsapp=word_to_whatsapp,
-        una_fraza=word_to_una_fraza,
-        afishes=word_to_afish,
-        total=total,
-    )
+    rows = [{
+        'word': word,
+        'total': total[word],
+        'examples': len(word_to_examples.get(word, [])),
+        'whatsapp': len(word_to_whatsapp.get(word, [])),
+        'una_fraza': len(word_to_una_fraza.get(word, [])),
+        'afishes': len(word_to_afish.get(word, [])),
+    } for word in sorted(words.keys())]
+    for filename, page_rows, pagination in paginate(os.path.join('words', language, 'index.html'), rows, lambda row: row['word']):
+        render(
+            template="ladino_words.html",
+            filename=filename,
+
+            title=f"{language}",
+            rows=page_rows,
+            pagination=pagination,
+        )
 
     render(
         template="dictionary_languages.html",
@@ -179,12 +460,243 @@ def export_main_html_page(html_dir):
         page="index",
     )
 
-def export_json(data, filename, pretty=False):
-    with open(filename, "w") as fh:
-        if pretty:
-            json.dump(data, fh, indent=4, ensure_ascii=False, sort_keys=True)
-        else:
-            json.dump(data, fh, ensure_ascii=False, sort_keys=True)
+def json_chunks(data, pretty=False, depth=json_stream_depth, level=0):
+    """
+    Encode data the same way as json.dumps(data, ensure_ascii=False, sort_keys=True) (with indent=4 if pretty)
+    but in pieces: the dictionaries in the first depth levels are taken apart. At the last level
+    json_block_size values are encoded at once, so the C encoder of the json module does most of the work.
+    """
+    encoder = json_pretty_encoder if pretty else json_encoder
+    if not isinstance(data, dict) or not data or depth == 0:
+        yield indent_json(encoder.encode(data), level, pretty)
+        return
+
+    inner = '\n' + ' ' * 4 * (level + 1) if pretty else ''
+    separator = ',' + inner if pretty else ', '
+    yield '{' + inner
+    keys = sorted(data)
+    if depth == 1:
+        for start in range(0, len(keys), json_block_size):
+            if start:
+                yield separator
+            block = encoder.encode({key: data[key] for key in keys[start:start + json_block_size]})
+            # without the braces and the indentation of the first key
+            block = block[6:-2] if pretty else block[1:-1]
+            yield indent_json(block, level, pretty)
+    else:
+        for position, key in enumerate(keys):
+            if position:
+                yield separator
+            yield encoder.encode(key) + ': '
+            yield from json_chunks(data[key], pretty, depth - 1, level + 1)
+    yield '\n' + ' ' * 4 * level + '}' if pretty else '}'
+
+def indent_json(text, level, pretty):
+    # strings are encoded with \n so every newline is between two lines of the json
+    if pretty and level:
+        return text.replace('\n', '\n' + ' ' * 4 * level)
+    return text
+
+def buffered(chunks, size=json_buffer_size):
+    """
+    Join the small pieces to blocks of about size characters.
+    """
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def export_json(data, filename, pretty=False, stream=False):
+    """
+    Large files (stream=True) are encoded while they are written, the others are written in the background.
+    Return the hash of the content.
+    """
+    filename = os.path.relpath(filename, html_path)
+    if render_only is not None and filename not in render_only and filename != 'dictionary.json':
+        return None
+    if stream:
+        return build.write(filename, buffered(json_chunks(data, pretty)))
+    return build.write(filename, list(json_chunks(data, pretty)))
+
+def dictionary_patch(old, new):
+    """
+    The words added, changed and removed in every language between two versions of dictionary.json.
+    """
+    patch = {'added': {}, 'changed': {}, 'removed': {}}
+    for language in sorted(set(old.keys()) | set(new.keys())):
+        before = old.get(language, {})
+        after = new.get(language, {})
+        added = {word: value for word, value in after.items() if word not in before}
+        changed = {word: value for word, value in after.items() if word in before and before[word] != value}
+        removed = sorted(word for word in before.keys() if word not in after)
+        for key, value in [('added', added), ('changed', changed), ('removed', removed)]:
+            if value:
+                patch[key][language] = value
+    return patch
+
+def export_similar_words(words, pretty=False):
+    """
+    Write the similar_words of the Ladino words to similar.json and return them.
+    If the words are the same as in the previous build, similar.json is read instead, as finding
+    the similar words takes a while.
+    """
+    inputs = hashlib.sha256((build.get_code_digest() + str(pretty) + '\n'.join(sorted(words))).encode('utf-8')).hexdigest()
+    if build.manifest.is_fresh('similar.json', inputs):
+        build.manifest.keep('similar.json')
+        with open(os.path.join(build.html_path, 'similar.json')) as fh:
+            return json.load(fh)
+    similar = similar_words(words)
+    build.write('similar.json', list(json_chunks(similar, pretty)), inputs=inputs)
+    return similar
+
+def export_dictionary_version(word_mapping, version, patches, pretty=False):
+    """
+    dictionary.version.json names the current version of dictionary.json and the previous versions
+    that have a dictionary.patch.{from}-{to}.json to it, so converter.js can update its cached copy.
+    The last patches versions are kept with the build state to create the patches of the next builds.
+    """
+    versions_dir = os.path.join(build.state_dir(build.target_path), 'dictionary')
+    versions_file = os.path.join(versions_dir, 'versions.json')
+    versions = []
+    if os.path.exists(versions_file):
+        with open(versions_file) as fh:
+            versions = json.load(fh)
+
+    patched = []
+    if patches:
+        text = json_encoder.encode(word_mapping)
+        current = json.loads(text)
+        for old_version in versions[-patches:]:
+            old_file = os.path.join(versions_dir, f'{old_version}.json')
+            if old_version == version or not os.path.exists(old_file):
+                continue
+            with open(old_file) as fh:
+                old = json.load(fh)
+            build.write(f'dictionary.patch.{old_version}-{version}.json', list(json_chunks(dictionary_patch(old, current), pretty)))
+            patched.append(old_version)
+
+        os.makedirs(versions_dir, exist_ok=True)
+        with open(os.path.join(versions_dir, f'{version}.json'), 'w') as fh:
+            fh.write(text)
+        versions = [old_version for old_version in versions if old_version != version] + [version]
+        for old_version in versions[:-patches]:
+            if os.path.exists(os.path.join(versions_dir, f'{old_version}.json')):
+                os.remove(os.path.join(versions_dir, f'{old_version}.json'))
+        with open(versions_file, 'w') as fh:
+            json.dump(versions[-patches:], fh)
+
+    build.write('dictionary.version.json', list(json_chunks({'version': version, 'patches': patched}, pretty)))
+
+def shard_prefix(word):
+    """
+    The shard of dictionary.json a word is in: its first letter, or the code point of it if it is not
+    a plain lower case letter or digit. Has to give the same as shard_prefix in ladino.js.
+    """
+    if word == '':
+        return '_'
+    if re.search(r'^[a-z0-9]$', word[0]):
+        return word[0]
+    return f"u{ord(word[0]):04x}"
+
+def any_language_table(word_mapping):
+    """
+    Map the search_key of every word of every language to the [language, word, Ladino words] of
+    the words with that key, for dictionary/any/{prefix}.json.
+    """
+    table = {}
+    for language in ['ladino', 'accented'] + languages:
+        for word, value in word_mapping.get(language, {}).items():
+            targets = [word] if language == 'ladino' else value
+            table.setdefault(search_key(word), []).append([language, word, targets])
+    return table
+
+def export_dictionary_shards(word_mapping, pretty=False, changed=None):
+    """
+    Split dictionary.json by language and first letter to dictionary/{language}/{prefix}.json
+    and list them in dictionary/manifest.json, so converter.js can load only the words it translates.
+    changed maps the languages to the words added, changed or removed since the previous build,
+    if it is given only the shards of those words are written again.
+    """
+    shards = collections.defaultdict(lambda: collections.defaultdict(dict))
+    for language, words in word_mapping.items():
+        for word, value in words.items():
+            shards[language][shard_prefix(word)][word] = value
+
+    # dictionary/any/{prefix}.json has the words of every language by their search_key,
+    # so the automatic mode of the converter finds the language of a word with a single lookup
+    for key, entries in any_language_table(word_mapping).items():
+        shards['any'][shard_prefix(key)][key] = entries
+
+    affected = None
+    if changed is not None:
+        affected = {(language, shard_prefix(word)) for language, words in changed.items() for word in words}
+        affected.update(('any', shard_prefix(search_key(word))) for language, words in changed.items() if language in ['ladino', 'accented'] + languages for word in words)
+        for language, prefix in affected:
+            if prefix not in shards[language]:
+                build.remove(f'dictionary/{language}/{prefix}.json')
+
+    hashes = []
+    for language in sorted(shards.keys()):
+        for prefix, shard in sorted(shards[language].items()):
+            filename = f'dictionary/{language}/{prefix}.json'
+            if affected is not None and (language, prefix) not in affected and filename in build.manifest.outputs:
+                hashes.append(build.manifest.outputs[filename]['hash'])
+                continue
+            hashes.append(build.write(filename, list(json_chunks(shard, pretty))))
+    manifest = {
+        # changes when any of the shards changes, so browsers do not mix old and new shards
+        'version': hashlib.sha256(''.join(hashes).encode('utf-8')).hexdigest()[0:asset_hash_length],
+        'shards': {language: sorted(shards[language].keys()) for language in list(word_mapping.keys()) + ['any']},
+    }
+    build.write('dictionary/manifest.json', list(json_chunks(manifest, pretty)))
+
+@functools.lru_cache(maxsize=None)
+def search_key(text):
+    """
+    The form of a word the prefix search compares: lower case without accents and other diacritics.
+    Has to give the same as search_key in search.js.
+    """
+    return ''.join(char for char in unicodedata.normalize('NFD', text.lower()) if unicodedata.category(char) != 'Mn')
+
+def search_prefix(key):
+    """
+    The shard of the search index a key is in: its first two characters, each one written as in shard_prefix.
+    """
+    return ''.join(char if re.search(r'^[a-z0-9]$', char) else f"u{ord(char):04x}" for char in key[0:2]) or '_'
+
+def export_search_index(word_mapping, pages, pretty=False, changed=None):
+    """
+    The prefix index of the Ladino words and of their translations for search.js.
+    search/{prefix}.json lists [key, word, language, [Ladino words]] sorted by the key, where the
+    Ladino words are the pages under words/ladino/ the entry leads to. Keys of one character,
+    like the Ladino words a, e, i and o, are in shards of their own.
+    search/manifest.json lists the prefixes, so the browser does not ask for shards that do not exist.
+    changed is the same as for export_dictionary_shards.
+    """
+    shards = collections.defaultdict(list)
+    for language in ['ladino'] + languages:
+        for word, value in word_mapping[language].items():
+            targets = sorted(target for target in ([word] if language == 'ladino' else value) if target in pages)
+            if targets:
+                key = search_key(word)
+                shards[search_prefix(key)].append([key, word, language, targets])
+
+    affected = None
+    if changed is not None:
+        affected = {search_prefix(search_key(word)) for language, words in changed.items() if language in ['ladino'] + languages for word in words}
+        for prefix in affected - set(shards.keys()):
+            build.remove(f'search/{prefix}.json')
+    for prefix, entries in sorted(shards.items()):
+        if affected is None or prefix in affected or f'search/{prefix}.json' not in build.manifest.outputs:
+            build.write(f'search/{prefix}.json', list(json_chunks(sorted(entries), pretty)))
+    build.write('search/manifest.json', list(json_chunks({'url': '/words/ladino/', 'prefixes': sorted(shards.keys())}, pretty)))
 
 def export_missing_words(yaml_files, missing_ladino_words, languages):
     root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -215,13 +727,8 @@ def export_missing_words(yaml_files, missing_ladino_words, languages):
                     missing_words.append(word)
 
         count[language] = len(missing_words)
-        with open(os.path.join(helper, f"{language}-missing.txt"), 'w') as fh:
-            for row in sorted(missing_rows):
-                print(f"{row:20} =", file=fh)
-
-        with open(os.path.join(helper, f"{language}-has.txt"), 'w') as fh:
-            for ladino, translations in sorted(existing_rows):
-                print(f"{ladino:20} = {', '.join(translations)}", file=fh)
+        build.write(os.path.join(dname, f"{language}-missing.txt"), [f"{row:20} =\n" for row in sorted(missing_rows)])
+        build.write(os.path.join(dname, f"{language}-has.txt"), [f"{ladino:20} = {', '.join(translations)}\n" for ladino, translations in sorted(existing_rows)])
 
         render(
             template="missing_words.html",
@@ -251,30 +758,59 @@ def export_missing_words(yaml_files, missing_ladino_words, languages):
 
     return count
 
+def dictionary_letters(words):
+    """
+    Split the words of a dictionary by their first letter, using the same prefixes as the shards of dictionary.json.
+    Return a list of (prefix, letter, words) sorted by the letter.
+    """
+    shards = collections.defaultdict(dict)
+    for word, value in words.items():
+        shards[shard_prefix(word)][word] = value
+    letters = []
+    for prefix, shard in shards.items():
+        letter = prefix if len(prefix) == 1 else chr(int(prefix[1:], 16))
+        letters.append((prefix, letter, shard))
+    return sorted(letters, key=lambda entry: entry[1])
+
+def dictionary_pages(name, words, **args):
+    """
+    The letter index of a single-page dictionary in {name}.html and a page for every letter in {name}/{prefix}.html.
+    Every letter page links to the next one so dictionary.js can load it when the reader scrolls to the end.
+    """
+    shards = dictionary_letters(words)
+    letters = [{'letter': letter, 'url': f"/{name}/{prefix}", 'count': len(shard)} for prefix, letter, shard in shards]
+    pages = [("dictionary_index.html", f"{name}.html", dict(args, letters=letters))]
+    for index, (prefix, letter, shard) in enumerate(shards):
+        pages.append(("dictionary.html", f"{name}/{prefix}.html", dict(
+            args,
+            title=f"{args['title']} - {letter}",
+            letters=letters,
+            letter=letter,
+            next_letter=letters[index + 1] if index + 1 < len(letters) else None,
+            words=shard,
+        )))
+    return pages
+
 def export_single_page_dictionaries(word_mapping, html_dir):
     logging.info("Export single-page dictionaries")
 
+    pages = []
     for language in languages:
-        render(
-            template="dictionary.html",
-            filename=f"{language}-ladino.html",
-
+        pages.extend(dictionary_pages(f"{language}-ladino",
             title=f"{language.title()} to Ladino dictionary",
             source=language.title(),
             target="Ladino",
             words=word_mapping[language],
-        )
-
-        render(
-            template="dictionary.html",
-            filename=f"ladino-{language}.html",
+        ))
 
+        pages.extend(dictionary_pages(f"ladino-{language}",
             title=f"Ladino to {language.title()} dictionary",
             source="Ladino",
             target=language.title(),
             trg=language,
             words=word_mapping['ladino'],
-        )
+        ))
+    render_pages(pages)
 
 def export_books(books, words, html_dir):
     if books:
@@ -315,6 +851,7 @@ def export_book(book, words, html_dir):
             template="book_page.html",
             filename=os.path.join('livros', data['path'], str(page['numero']) + ".html"),
             html_text=page['teksto'].replace("\n", "<br>"),
+            glosses=page_glosses(page['teksto']),
             prev_page=(pages[idx-1]['numero'] if idx > 0 else "."),
             next_page=(pages[idx+1]['numero'] if idx < len(pages)-1 and idx != data['publish']-1 else "."),
             footer=data['footer'],
@@ -331,26 +868,36 @@ def export_book(book, words, html_dir):
     return {'path': data['path'], 'titolo': data['titolo']}
 
 
-def export_whatsapp_and_update_dictionary(dictionary, whatsapp_dir, html_dir):
+def map_words_to_whatsapp(messages):
+    word_to_whatsapp = {}
+    for message in messages:
+        #print(message)
+        page = message['page']
+
+        # WhatsApp message that are ladino only have a 'text' field, messages with hebrew have a field called teksto
+        words_in_message = re.findall(r'\w+', message['titulo'])
+        if 'text' in messages:
+            words_in_message += re.findall(r'\w+', message['text'])
+        else:
+            for sentence in message['teksto']:
+                words_in_message += re.findall(r'\w+', sentence['ladino'])
+        for word in words_in_message:
+            word = word.lower()
+            if word not in word_to_whatsapp:
+                word_to_whatsapp[word] = {}
+            word_to_whatsapp[word][page] = message['titulo']
+    return word_to_whatsapp
+
+def whatsapp_images(messages, whatsapp_dir, resize_images):
+    if not resize_images:
+        return {}
+    return export_images({message['img']: os.path.join(whatsapp_dir, 'img', message['img']) for message in messages if message.get('img')}, 'whatsapeando')
+
+def export_whatsapp_and_update_dictionary(dictionary, whatsapp_dir, html_dir, resize_images=False):
     word_to_whatsapp = {}
     if whatsapp_dir:
         messages = whatsapp.get_messages(whatsapp_dir) # list of dicts
-        for message in messages:
-            #print(message)
-            page = message['page']
-
-            # WhatsApp message that are ladino only have a 'text' field, messages with hebrew have a field called teksto
-            words_in_message = re.findall(r'\w+', message['titulo'])
-            if 'text' in messages:
-                words_in_message += re.findall(r'\w+', message['text'])
-            else:
-                for sentence in message['teksto']:
-                    words_in_message += re.findall(r'\w+', sentence['ladino'])
-            for word in words_in_message:
-                word = word.lower()
-                if word not in word_to_whatsapp:
-                    word_to_whatsapp[word] = {}
-                word_to_whatsapp[word][page] = message['titulo']
+        word_to_whatsapp = map_words_to_whatsapp(messages)
 
         dictionary.count['whatsapp'] = {
             'all' : len(messages),
@@ -358,7 +905,7 @@ def export_whatsapp_and_update_dictionary(dictionary, whatsapp_dir, html_dir):
             'images': len(list(filter(lambda msg: msg.get('img') is not None, messages))),
         }
         #print(messages)
-        export_whatsapp(messages, dictionary.pages['ladino'].keys(), html_dir)
+        export_whatsapp(messages, dictionary.pages['ladino'].keys(), html_dir, images=whatsapp_images(messages, whatsapp_dir, resize_images))
     return word_to_whatsapp
 
 
@@ -401,7 +948,7 @@ def get_missing_words(dictionary, examples):
 
     for example in examples:
         separate_words = get_separate_words(example['ladino'])
-        for word in (separate_words - all_the_words):
+        for word in sorted(separate_words - all_the_words):
             if re.search(r'^[0-9]+$', word):
                 continue
             # print(word)
@@ -413,15 +960,23 @@ def get_missing_words(dictionary, examples):
     # print(missing_words)
     return missing_words
 
-def export_to_html(config, dictionary, examples, word_to_examples, sound_people, path_to_repo, html_dir, whatsapp_dir=None, unafraza=None, pages=None, books=None, ladinadores=None, enkontros=None, pretty=False):
+def export_to_html(config, dictionary, examples, word_to_examples, sound_people, path_to_repo, html_dir, whatsapp_dir=None, unafraza=None, pages=None, books=None, ladinadores=None, enkontros=None, pretty=False, incremental=False, minify=False, patches=0, page_size=500, resize_images=False):
     logging.info("Export to HTML")
-    os.makedirs(html_dir, exist_ok=True)
-    global html_path
-    html_path = html_dir
+    global html_path, site_config, glossary, listing_page_size
 
-    remove_previous_content_of(html_dir)
+    # The build is written to a staging directory that starts with the previous content.
+    # Unchanged files are not written again, the files that are not generated any more are
+    # removed and the staging directory replaces html_dir at the end of the build.
+    html_dir = build.start(html_dir, incremental=incremental, minify=minify)
+    html_path = html_dir
+    site_config = config
+    glossary = dictionary.word_mapping['ladino']
+    listing_page_size = page_size
 
-    export_json(dictionary.word_mapping, os.path.join(html_dir, "dictionary.json"), pretty=pretty)
+    content_hash = export_json(dictionary.word_mapping, os.path.join(html_dir, "dictionary.json"), pretty=pretty, stream=True)
+    export_dictionary_version(dictionary.word_mapping, content_hash[0:asset_hash_length], patches, pretty=pretty)
+    export_dictionary_shards(dictionary.word_mapping, pretty=pretty)
+    export_search_index(dictionary.word_mapping, dictionary.pages['ladino'], pretty=pretty)
 
     global sitemap
     sitemap = set()
@@ -432,15 +987,12 @@ def export_to_html(config, dictionary, examples, word_to_examples, sound_people,
     word_to_afish = {}
     if ladinadores is not None:
         afishes = load_ladinadores(ladinadores)
-        export_ladinadores(dictionary.yaml_files, afishes)
+        images = {}
+        if resize_images:
+            images = export_images({entry['img']: os.path.join(ladinadores, 'docs', 'afishes', entry['img']) for entry in afishes}, 'afishes')
+        export_ladinadores(dictionary.yaml_files, afishes, images)
         dictionary.count["afishes"] = len (afishes)
-        for afish in afishes:
-            for word in afish.get('palavras', []):
-                if word not in word_to_afish:
-                    word_to_afish[word] = {}
-                filename = afish['filename']
-                title = afish['titulo']
-                word_to_afish[word][filename] = title
+        word_to_afish = map_words_to_afishes(afishes)
     if enkontros is not None:
         enkontros_videos, content, short, people = load_videos(enkontros)
 
@@ -454,7 +1006,7 @@ def export_to_html(config, dictionary, examples, word_to_examples, sound_people,
     dictionary.count["examples_with_audio"] = examples_with_audio
 
 
-    word_to_whatsapp = export_whatsapp_and_update_dictionary(dictionary, whatsapp_dir, html_dir)
+    word_to_whatsapp = export_whatsapp_and_update_dictionary(dictionary, whatsapp_dir, html_dir, resize_images)
 
     word_to_una_fraza, count_una_fraza = get_words_from_una_fraza(unafraza, dictionary, html_dir)
     dictionary.count["una_fraza_al_dia"] = count_una_fraza
@@ -480,20 +1032,153 @@ def export_to_html(config, dictionary, examples, word_to_examples, sound_people,
     export_lists(config, dictionary.lists, html_dir)
     export_gramer(config, dictionary.gramer, html_dir)
     export_verbs(config, dictionary.gramer['verb'], html_dir)
-    export_examples(copy.deepcopy(examples), dictionary.pages['ladino'].keys(), sound_people, html_dir)
+    export_examples(examples, dictionary.pages['ladino'].keys(), sound_people, html_dir)
     export_listed_pages(config, path_to_repo, html_dir)
     export_fixed_pages(pages)
 
-    export_dictionary_pages(dictionary.pages, word_to_examples, word_to_whatsapp, word_to_una_fraza, word_to_afish, html_dir)
+    similar = export_similar_words(dictionary.pages['ladino'].keys(), pretty=pretty)
+    export_dictionary_pages(dictionary.pages, word_to_examples, word_to_whatsapp, word_to_una_fraza, word_to_afish, html_dir, similar)
     export_to_hunspell(dictionary.word_mapping, html_dir)
 
     missing_ladino_words = get_missing_words(dictionary, examples)
     count_missing_words = export_missing_words(dictionary.yaml_files, missing_ladino_words, languages)
 
     dictionary.count["missing_words"] = count_missing_words
-    export_json(dictionary.count, os.path.join(html_dir, "count.json"), pretty=pretty)
+    export_json(dictionary.count, os.path.join(html_dir, "count.json"), pretty=pretty, stream=True)
     export_statistics_html_page(dictionary.count, html_dir)
 
+def map_words_to_afishes(afishes):
+    word_to_afish = {}
+    for afish in afishes:
+        for word in afish.get('palavras', []):
+            if word not in word_to_afish:
+                word_to_afish[word] = {}
+            filename = afish['filename']
+            title = afish['titulo']
+            word_to_afish[word][filename] = title
+    return word_to_afish
+
+def find_word_files(dictionary, words):
+    """
+    The loaded yaml files of the given Ladino words and all the headwords they define.
+    """
+    word_files = []
+    headwords = set()
+    for word in words:
+        plain = word.lower()
+        found = False
+        for data in dictionary.yaml_files:
+            versions = list(data['versions'])
+            for version in data['versions']:
+                versions.extend(version.get('alternative-spelling', []))
+            if plain not in {version['ladino'].lower() for version in versions}:
+                continue
+            found = True
+            if data not in word_files:
+                word_files.append(data)
+            headwords.update(version['ladino'].lower() for version in versions)
+            for conjugation in data.get('conjugations', {}).values():
+                headwords.update(version['ladino'].lower() for version in conjugation.values())
+        if not found:
+            raise LadinoError(f"The word '{word}' is not in the dictionary")
+    return word_files, headwords & set(dictionary.pages['ladino'].keys())
+
+def export_entities(config, dictionary, examples, word_to_examples, sound_people, html_dir, words=None, example_files=None, whatsapp_dir=None, unafraza=None, ladinadores=None, pretty=False, minify=False, patches=0, page_size=500, resize_images=False):
+    """
+    Re-render only the pages affected by the given words and example files on top of an existing build.
+    """
+    logging.info(f"Export the pages of words {words} and examples {example_files}")
+    global html_path, site_config, glossary, sitemap, render_only, listing_page_size
+    html_path = html_dir
+    site_config = config
+    glossary = dictionary.word_mapping['ladino']
+    listing_page_size = page_size
+    sitemap = set()
+    build.start(html_dir, incremental=True, partial=True, minify=minify)
+    collect_static_files()
+
+    word_files, headwords = find_word_files(dictionary, words or [])
+
+    targets = set()
+    for data in word_files:
+        for cat in data.get('kategorias', []):
+            targets.add(os.path.join('kategorias', f"{cat}.html"))
+            targets.update(os.path.join('kategorias', f"{cat}-ladino-{language}.txt") for language in languages)
+        targets.add(os.path.join('orijenes', f"{data['orijen'].lower()}.html"))
+        targets.update(os.path.join('linguas', f"{language.lower()}.html") for language in data.get('linguas', []))
+        targets.update(f"listas/{lst}.html" for lst, listed in dictionary.lists.items() if data in listed)
+        targets.add(os.path.join('gramer', f"{data['grammar'].lower()}.html"))
+        if data['grammar'] == 'verb':
+            ladino = data['versions'][0]['ladino']
+            targets.add(os.path.join('verbos', f'{ladino}.html'))
+            targets.add(os.path.join('verbos', f'{ladino}.json'))
+            targets.add(os.path.join('verbos', 'index.html'))
+    for word in headwords:
+        targets.update(os.path.join('egzempios', example['url'] + '.html') for example in word_to_examples.get(word, []))
+
+    for filename in example_files or []:
+        filename = os.path.basename(filename)
+        matching = [example for example in examples if example['filename'] == filename]
+        if not matching:
+            raise LadinoError(f"The example file '{filename}' is not among the examples")
+        for example in matching:
+            targets.add(os.path.join('egzempios', example['url'] + '.html'))
+            headwords.update(deaccent(word) for word in get_separate_words(example['ladino']) if deaccent(word) in dictionary.pages['ladino'])
+        targets.add(os.path.join('egzempios', 'index.html'))
+        targets.update(os.path.join('egzempios', f"{person}.html") for person in list(sound_people.keys()) + ['silent'])
+
+    for word in headwords:
+        targets.add(os.path.join('words', 'ladino', f'{word}.html'))
+        targets.add(os.path.join('words', 'ladino', f'{word}.json'))
+
+    word_to_whatsapp = {}
+    messages = []
+    if whatsapp_dir:
+        messages = whatsapp.get_messages(whatsapp_dir)
+        word_to_whatsapp = map_words_to_whatsapp(messages)
+        for word in headwords:
+            targets.update(os.path.join('whatsapeando', f"{page}.html") for page in word_to_whatsapp.get(word, {}))
+    word_to_afish = {}
+    if ladinadores is not None:
+        word_to_afish = map_words_to_afishes(load_ladinadores(ladinadores))
+
+    render_only = targets
+    try:
+        word_to_una_fraza, _ = get_words_from_una_fraza(unafraza, dictionary, html_dir)
+        pages = {'ladino': {word: dictionary.pages['ladino'][word] for word in sorted(headwords)}}
+        similar = export_similar_words(dictionary.pages['ladino'].keys(), pretty=pretty)
+        export_dictionary_pages(pages, word_to_examples, word_to_whatsapp, word_to_una_fraza, word_to_afish, html_dir, similar)
+        export_categories(config, dictionary.categories, html_dir)
+        export_orijenes(config, dictionary.orijenes, html_dir)
+        export_languages(config, dictionary.languages, html_dir)
+        export_lists(config, dictionary.lists, html_dir)
+        export_gramer(config, dictionary.gramer, html_dir)
+        export_verbs(config, dictionary.gramer['verb'], html_dir)
+        export_examples(examples, dictionary.pages['ladino'].keys(), sound_people, html_dir)
+        if messages:
+            export_whatsapp(messages, dictionary.pages['ladino'].keys(), html_dir, images=whatsapp_images(messages, whatsapp_dir, resize_images))
+    finally:
+        render_only = None
+
+    # Only the files made from the words that changed are written again
+    previous = None
+    if 'dictionary.json' in build.manifest.previous and os.path.exists(os.path.join(html_dir, 'dictionary.json')):
+        with open(os.path.join(html_dir, 'dictionary.json')) as fh:
+            previous = json.load(fh)
+    content_hash = export_json(dictionary.word_mapping, os.path.join(html_dir, "dictionary.json"), pretty=pretty, stream=True)
+    if previous is None or content_hash != build.manifest.previous['dictionary.json']['hash']:
+        changed = None
+        if previous is not None:
+            patch = dictionary_patch(previous, dictionary.word_mapping)
+            changed = collections.defaultdict(set)
+            for key in ['added', 'changed', 'removed']:
+                for language, words in patch[key].items():
+                    changed[language].update(words)
+        export_dictionary_version(dictionary.word_mapping, content_hash[0:asset_hash_length], patches, pretty=pretty)
+        export_dictionary_shards(dictionary.word_mapping, pretty=pretty, changed=changed)
+        export_search_index(dictionary.word_mapping, dictionary.pages['ladino'], pretty=pretty, changed=changed)
+    patch_sitemap(html_dir)
+
 def export_videos(videos, content, short, people, path):
     logging.info(f"Export videos to {path}")
 
@@ -544,8 +1229,12 @@ def export_videos(videos, content, short, people, path):
 
 
 
-def export_ladinadores(yaml_files, data):
+def export_ladinadores(yaml_files, data, images=None):
+    """
+    images are the resized copies of the afishes, see ladino.images.export_images
+    """
     logging.info("Export Ladinadores")
+    images = images or {}
 
     render(
         template="afishes.html",
@@ -553,6 +1242,7 @@ def export_ladinadores(yaml_files, data):
 
         title=f"Afishes de Los Ladinadores",
         data=data,
+        images=images,
     )
 
     for entry in data:
@@ -579,6 +1269,7 @@ def export_ladinadores(yaml_files, data):
 
             title=entry['titulo'],
             entry=entry,
+            image=images.get(entry['img']),
             languages=languages,
             words=words,
             missing_words=missing_words,
@@ -594,7 +1285,7 @@ def export_fixed_pages(pages):
         mapping = json.load(fh)
     for source, target in mapping.items():
         rtl = source == 'he'
-        for filename in os.listdir(os.path.join(pages, source)):
+        for filename in sorted(os.listdir(os.path.join(pages, source))):
             logging.info(f"Exporting {source}/{filename}")
             if filename.endswith('.md'):
                 target_file = filename.replace('.md', '.html')
@@ -614,7 +1305,7 @@ def export_lists_html_page(config, html_dir):
         filename="dictionaries.html",
 
         title=f"Ladino dictionaries",
-        github_run_id=os.environ.get('GITHUB_RUN_ID', ''),
+        github_run_id='' if ladino.common.reproducible else os.environ.get('GITHUB_RUN_ID', ''),
         languages=languages,
     )
 
@@ -645,22 +1336,34 @@ def export_markdown_page(path_to_md_file, target, rtl):
         content=content,
     )
 
+def derived_view(source, derived):
+    """
+    Read-only view of the source data with the computed fields laid over it.
+    The source data is shared, not copied.
+    """
+    return collections.ChainMap(derived, types.MappingProxyType(source))
+
+def example_view(example, words):
+    derived = {
+        'ladino_html': link_words(example['ladino'], words),
+    }
+    for language in languages:
+        # We have duplicate translations for some of the examples.
+        if language in example:
+            if example[language].__class__.__name__ == "str":
+                derived[f"{language}_html"] = newline_to_br(example[language])
+            elif example[language].__class__.__name__ == "list":
+                derived[f"{language}_html"] = "<br>".join(map(newline_to_br, example[language]))
+            else:
+                raise Exception(f"invalid type: {example[language].__class__.__name__}")
+    return derived_view(example, derived)
+
 def export_individual_examples(examples, words, sound_people, target):
     logging.info(f"export_individual_examples {len(examples)}")
 
     sounds = {}
     for example in examples:
         logging.info(f"export example from {example['filename']} to {example['url']}")
-        example['ladino_html'] = link_words(example['ladino'], words)
-        for language in languages:
-            # We have duplicate translations for some of the examples.
-            if language in example:
-                if example[language].__class__.__name__ == "str":
-                    example[f"{language}_html"] = newline_to_br(example[language])
-                elif example[language].__class__.__name__ == "list":
-                    example[f"{language}_html"] = "<br>".join(map(newline_to_br, example[language]))
-                else:
-                    raise Exception(f"invalid type: {example[language].__class__.__name__}")
         if 'audio' in example:
             for sound in example['audio']:
                 person = sound['person']
@@ -682,6 +1385,7 @@ def export_individual_examples(examples, words, sound_people, target):
             title='Egzempio',
             example=example,
             people=sound_people,
+            glosses=page_glosses(example['ladino_html']),
         )
 
     return sounds
@@ -693,55 +1397,49 @@ def export_examples(all_examples, words, sound_people, html_dir):
     target = 'egzempios'
     examples_dir = os.path.join(html_dir, target)
     os.makedirs(examples_dir, exist_ok=True)
-    all_examples.sort(key=lambda ex: ex['ladino'])
-    sounds = {}
-    for example in all_examples:
-        example['ladino_html'] = link_words(example['ladino'], words)
+    all_examples = [example_view(example, words) for example in sorted(all_examples, key=lambda ex: ex['ladino'])]
 
     sounds = export_individual_examples(all_examples, words, sound_people, target)
 
     for person, examples in sounds.items():
         if person == 'silent':
-            render(
-                template="examples_with_sound.html",
-                filename=os.path.join(target, person + '.html'),
-
-                title=f'Egzempios sin audio',
-                #sounds=sounds,
-                person_titulo='',
-                page=target,
-                examples=examples,
-                languages=languages,
-            )
-
+            title = f'Egzempios sin audio'
+            person_titulo = ''
         else:
+            title = f'Egzempios kon la boz de {sound_people[person]["nombre"]}'
+            person_titulo = sound_people[person]['titulo']
+        for filename, page_examples, pagination in paginate(os.path.join(target, person + '.html'), examples, lambda example: example['ladino']):
             render(
                 template="examples_with_sound.html",
-                filename=os.path.join(target, person + '.html'),
+                filename=filename,
 
-                title=f'Egzempios kon la boz de {sound_people[person]["nombre"]}',
+                title=title,
                 #sounds=sounds,
-                person_titulo=sound_people[person]['titulo'],
+                person_titulo=person_titulo,
                 page=target,
-                examples=examples,
+                examples=page_examples,
                 languages=languages,
+                pagination=pagination,
             )
 
     #print(all_examples)
     sound_people['silent'] = {
         'nombre': 'Silent',
     }
-    render(
-        template="examples.html",
-        filename=os.path.join(target, 'index.html'),
-
-        title='Egzempios',
-        sounds=sounds,
-        people=sound_people,
-        page=target,
-        all_examples=all_examples,
-        languages=languages,
-    )
+    # only the names of the people, the examples are on the pages of the pagination
+    speakers = [{'id': person, 'nombre': sound_people[person]['nombre']} for person in sounds.keys()]
+    for filename, page_examples, pagination in paginate(os.path.join(target, 'index.html'), all_examples, lambda example: example['ladino']):
+        render(
+            template="examples.html",
+            filename=filename,
+
+            title='Egzempios',
+            speakers=speakers,
+            page=target,
+            all_examples=page_examples,
+            languages=languages,
+            pagination=pagination,
+        )
 
 def export_ufad(messages, words, html_dir):
     ufad_dir = os.path.join(html_dir, 'ufad')
@@ -759,39 +1457,47 @@ def export_ufad(messages, words, html_dir):
 
             title=message['Ladino'],
             message=message,
+            glosses=page_glosses(message['ladino_html']),
             prev_message=messages[idx-1]['id'],
             next_message=messages[next_idx]['id'],
         )
 
-    render(
-        template="ufad_list.html",
-        filename=os.path.join('ufad', 'index.html'),
+    for filename, page_messages, pagination in paginate(os.path.join('ufad', 'index.html'), messages, lambda message: message['Ladino']):
+        render(
+            template="ufad_list.html",
+            filename=filename,
 
-        title='Una fraza al diya',
-        messages=messages,
-    )
+            title='Una fraza al diya',
+            messages=page_messages,
+            pagination=pagination,
+        )
 
 
-def export_whatsapp(messages, words, html_dir):
+def export_whatsapp(messages, words, html_dir, images=None):
+    images = images or {}
     whatsapp_dir = os.path.join(html_dir, 'whatsapeando')
     os.makedirs(whatsapp_dir, exist_ok=True)
     messages.sort(key=lambda message: message['pub'], reverse=True)
-    render(
-        template="whatsapeando_list.html",
-        filename=os.path.join('whatsapeando', 'index.html'),
+    for filename, page_messages, pagination in paginate(os.path.join('whatsapeando', 'index.html'), messages, lambda message: message['titulo']):
+        render(
+            template="whatsapeando_list.html",
+            filename=filename,
 
-        title='Estamos Whatsapeando',
-        messages=messages,
-    )
+            title='Estamos Whatsapeando',
+            messages=page_messages,
+            images={message['img']: images[message['img']] for message in page_messages if message.get('img') in images},
+            pagination=pagination,
+        )
     for idx, message in enumerate(messages):
-        teksto = copy.deepcopy(message['teksto'])
-        #print(teksto)
-        for entry in teksto:
-            text = link_words(entry['ladino'], words)
-            text = text.replace("\n", "<br>")
-            entry['ladino'] = text
+        teksto = []
+        for entry in message['teksto']:
+            derived = {
+                'ladino': link_words(entry['ladino'], words).replace("\n", "<br>"),
+            }
             if 'ebreo' in entry:
-                entry['ebreo'] = entry['ebreo'].replace("\n", "<br>")
+                derived['ebreo'] = entry['ebreo'].replace("\n", "<br>")
+            teksto.append(derived_view(entry, derived))
+        title_links = link_words(message['titulo'], words)
         next_idx = idx+1 if idx+1 < len(messages) else 0
         #print(next_idx)
         render(
@@ -801,48 +1507,92 @@ def export_whatsapp(messages, words, html_dir):
             title=message['titulo'],
             sound_filename=message['filename'],
             teksto=teksto,
-            title_links=link_words(message['titulo'], words),
+            title_links=title_links,
+            glosses=page_glosses(title_links, *[entry['ladino'] for entry in teksto]),
             prev_message=messages[idx-1]['page'],
             next_message=messages[next_idx]['page'],
             img_filename=message.get('img'),
+            image=images.get(message.get('img')),
         )
 
-def copy_static_files(html_dir):
+def collect_static_files():
+    """
+    The content of the static js and css files and the content-hashed names they are published under.
+    Fill the assets mapping used by the templates to refer to them.
+    """
     root = os.path.dirname(os.path.abspath(__file__))
-
-    shutil.copy(os.path.join(root, 'robots.txt'), os.path.join(html_dir, 'robots.txt'))
+    static_files = {}
     for part in ["js", "css"]:
         source_dir = os.path.join(root, part)
 
-        part_dir = os.path.join(html_dir, part)
-        os.makedirs(part_dir, exist_ok=True)
-
-        for filename in os.listdir(source_dir):
+        for filename in sorted(os.listdir(source_dir)):
             if filename.endswith(".swp"):
                 continue
+            with open(os.path.join(source_dir, filename)) as fh:
+                lines = fh.readlines()
             if part == "js":
-                with open(os.path.join(source_dir, filename)) as fh:
-                    lines = filter(lambda line: not line.startswith('module.exports'), fh.readlines())
-                with open(os.path.join(part_dir, filename), "w") as fh:
-                    for line in lines:
-                        print(line, end="", file=fh)
-            else:
-                shutil.copy(os.path.join(source_dir, filename), os.path.join(part_dir, filename))
+                lines = filter(lambda line: not line.startswith('module.exports'), lines)
+            static_files[f"{part}/{filename}"] = ''.join(lines)
+
+    assets.clear()
+    for path, content in static_files.items():
+        stem, ext = os.path.splitext(path)
+        assets[path] = f"{stem}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[0:asset_hash_length]}{ext}"
+    return static_files
+
+def copy_static_files(html_dir):
+    root = os.path.dirname(os.path.abspath(__file__))
+
+    with open(os.path.join(root, 'robots.txt')) as fh:
+        build.write('robots.txt', fh.read())
+    for path, content in collect_static_files().items():
+        # The plain names are kept for pages and links that still refer to them.
+        build.write(path, content)
+        build.write(assets[path], content)
+    export_json(assets, os.path.join(html_dir, 'assets.json'), pretty=True)
+
+def export_service_worker():
+    """
+    precache.json maps the url of the content-hashed assets and of the precache_files to the hash of their content.
+    sw.js has the hash of precache.json in it, so the browser installs it again after every change
+    and it downloads only the files whose hash changed.
+    Call it after the files were minified, as it uses the hashes of the files on the disk.
+    """
+    build.flush()
+    files = {}
+    for filename in sorted(set(assets.values()) | set(precache_files)):
+        entry = build.manifest.outputs.get(filename)
+        if entry is None:
+            continue
+        url = page_url(filename) if filename.endswith('.html') else f"/{filename}"
+        files[url] = entry.get('minified', entry['hash'])[0:16]
+    data = json.dumps({'files': files}, indent=4, sort_keys=True)
+    version = build.write('precache.json', data)[0:asset_hash_length]
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(root, 'sw.js')) as fh:
+        build.write('sw.js', f"const version = '{version}';\n{fh.read()}")
 
 def generate_main_page(html_dir):
     copy_static_files(html_dir)
     export_main_html_page(html_dir)
 
-def remove_previous_content_of(html_dir):
-    for thing in glob.glob(os.path.join(html_dir, '*')):
-        if os.path.isdir(thing):
-            shutil.rmtree(thing) # TODO remove all the old content from html_dir
-        else:
-            os.remove(thing)
-
 def newline_to_br(text):
     return text.replace("\n", "<br>")
 
+def page_glosses(*texts):
+    """
+    The translations of the Ladino words linked in the html texts of a page, so hover.js can show
+    them as tooltips without loading the whole dictionary.
+    """
+    glosses = {}
+    for text in texts:
+        for word in re.findall(r'<a href="/words/ladino/([^"]+)">', text):
+            if word in glosses or word not in glossary:
+                continue
+            glosses[word] = {language: ', '.join(glossary[word][language]) for language in languages if glossary[word].get(language)}
+    return glosses
+
 def link_words(sentence, words):
     # logging.info(f"link_words({sentence})")
     sentence = newline_to_br(sentence)
@@ -1009,15 +1759,117 @@ def export_verbs(config, verbs, html_dir):
         languages=languages,
     )
 
+    export_conjugation_bundle(config, verbs)
+
+
+def export_conjugation_bundle(config, verbs):
+    """
+    All the conjugated forms in verbos/conjugations/{n}.json, at most verb_shard_size bytes each:
+    {verb: [[tense, pronoun, form], ...]} where tense and pronoun are indexes in the tables of
+    verbos/conjugations/manifest.json. The manifest also lists the first and last verb of every shard.
+    """
+    tenses = config['tiempos']
+    pronouns = config['pronombres']
+    tense_index = {tense: ix for ix, tense in enumerate(tenses)}
+    pronoun_index = {pronoun: ix for ix, pronoun in enumerate(pronouns)}
+
+    conjugations = {}
+    for verb in verbs:
+        forms = []
+        for tense, persons in verb['conjugations'].items():
+            for pronoun, form in persons.items():
+                forms.append([tense_index[tense], pronoun_index[pronoun], form['ladino']])
+        conjugations[verb['versions'][0]['ladino']] = sorted(forms)
+
+    shards = []
+    shard = {}
+    size = 0
+    for ladino in sorted(conjugations.keys()):
+        entry = json_encoder.encode({ladino: conjugations[ladino]})
+        if shard and size + len(entry) > verb_shard_size:
+            shards.append(shard)
+            shard = {}
+            size = 0
+        shard[ladino] = conjugations[ladino]
+        size += len(entry)
+    if shard:
+        shards.append(shard)
+
+    manifest = {'tenses': tenses, 'pronouns': pronouns, 'shards': []}
+    for number, shard in enumerate(shards, start=1):
+        filename = f'verbos/conjugations/{number}.json'
+        build.write(filename, json_encoder.encode(shard))
+        manifest['shards'].append({'file': f'/{filename}', 'first': min(shard.keys()), 'last': max(shard.keys()), 'verbs': len(shard)})
+    build.write('verbos/conjugations/manifest.json', json_encoder.encode(manifest))
+
+def page_file(entry):
+    """
+    The html file of a url in the sitemap.
+    """
+    if entry == '' or entry.endswith('/'):
+        return entry + 'index.html'
+    return entry + '.html'
+
+def lastmod(filename):
+    """
+    The date the content of the file last changed. Files with unchanged content are not written
+    again, so this is the modification time recorded in the build manifest.
+    A reproducible build uses the time of the build.
+    """
+    if ladino.common.reproducible:
+        return ladino.common.start.strftime('%Y-%m-%d')
+    entry = build.manifest.outputs.get(filename) if build.manifest is not None else None
+    if entry is None or 'mtime' not in entry:
+        return None
+    return datetime.datetime.fromtimestamp(entry['mtime'] / 1e9, tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+
+def sitemap_urls(entries, dates):
+    yield sitemap_header.format('urlset', 'sitemap')
+    for entry, date in zip(entries, dates):
+        if date is None:
+            yield f'<url><loc>{site_url}{entry}</loc></url>\n'
+        else:
+            yield f'<url><loc>{site_url}{entry}</loc><lastmod>{date}</lastmod></url>\n'
+    yield '</urlset>'
+
+def sitemap_index(parts):
+    yield sitemap_header.format('sitemapindex', 'siteindex')
+    for filename, date in parts:
+        if date is None:
+            yield f'<sitemap><loc>{site_url}{filename}</loc></sitemap>\n'
+        else:
+            yield f'<sitemap><loc>{site_url}{filename}</loc><lastmod>{date}</lastmod></sitemap>\n'
+    yield '</sitemapindex>'
 
 def create_sitemap(html_dir):
-    #return
-    xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9 http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd" xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-'''
-    for entry in sorted(sitemap):
-        xml += f'''<url><loc>https://kantoniko.com/{entry}</loc></url>\n'''
-    xml += '</urlset>'
-    with open(os.path.join(html_dir, 'sitemap.xml'), 'w') as fh:
-        fh.write(xml)
+    """
+    sitemap.xml is an index of the sitemap-1.xml, sitemap-2.xml, ... files, each one listing
+    at most sitemap_limit pages. They are streamed to the disk.
+    """
+    build.flush()
+    entries = sorted(sitemap)
+    parts = []
+    for start in range(0, max(len(entries), 1), sitemap_limit):
+        chunk = entries[start:start + sitemap_limit]
+        dates = [lastmod(page_file(entry)) for entry in chunk]
+        filename = f'sitemap-{len(parts) + 1}.xml'
+        build.write(filename, sitemap_urls(chunk, dates))
+        parts.append((filename, max(filter(None, dates), default=None)))
+    build.write('sitemap.xml', sitemap_index(parts))
+
+def patch_sitemap(html_dir):
+    """
+    Add the pages rendered in a targeted rebuild to the sitemap of the existing build.
+    """
+    sitemap_file = os.path.join(html_dir, 'sitemap.xml')
+    if os.path.exists(sitemap_file):
+        with open(sitemap_file) as fh:
+            parts = re.findall(rf'<loc>{re.escape(site_url)}(sitemap-\d+\.xml)</loc>', fh.read())
+        if not parts:
+            # written before the sitemap was split
+            parts = ['sitemap.xml']
+        for filename in parts:
+            with open(os.path.join(html_dir, filename)) as fh:
+                sitemap.update(re.findall(rf'<loc>{re.escape(site_url)}(.*?)</loc>', fh.read()))
+    create_sitemap(html_dir)
 
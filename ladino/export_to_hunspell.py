@@ -1,33 +1,29 @@
 import os
 import json
-import datetime
+
+import ladino.build as build
 
 def export_to_hunspell(dictionary, html_dir):
-    hun_dir = os.path.join(html_dir, 'hunspell')
-    os.makedirs(hun_dir, exist_ok=True)
-    now = datetime.datetime.now()
+    hun_dir = 'hunspell'
 
-    with open(os.path.join(hun_dir, "lad.dic"), "w") as fh:
-        print(len(dictionary["ladino"].keys()), file=fh)
-        for word in sorted(dictionary["ladino"].keys()):
-            print(word, file=fh)
+    lines = [f'{len(dictionary["ladino"].keys())}\n']
+    for word in sorted(dictionary["ladino"].keys()):
+        lines.append(f"{word}\n")
+    build.write(os.path.join(hun_dir, "lad.dic"), lines)
 
-    with open(os.path.join(hun_dir, "lad.aff"), "w") as fh:
-        print("SET UTF-8", file=fh)
-        print("FLAG UTF-8", file=fh)
-        rows = []
-        for word in dictionary['kasteyano'].keys():
-            if ' ' in word:
+    rows = []
+    for word in dictionary['kasteyano'].keys():
+        if ' ' in word:
+            continue
+        for ladino in dictionary['kasteyano'][word]:
+            if ' ' in ladino:
+                continue
+            if word == ladino:
                 continue
-            for ladino in dictionary['kasteyano'][word]:
-                if ' ' in ladino:
-                    continue
-                if word == ladino:
-                    continue
-                rows.append(f"REP {word} {ladino}")
-        print(f"REP {len(rows)}", file=fh)
-        for row in rows:
-            print(row, file=fh)
+            rows.append(f"REP {word} {ladino}")
+    lines = ["SET UTF-8\n", "FLAG UTF-8\n", f"REP {len(rows)}\n"]
+    lines.extend(f"{row}\n" for row in rows)
+    build.write(os.path.join(hun_dir, "lad.aff"), lines)
 
 if __name__ == "__main__":
     export()
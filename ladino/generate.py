@@ -10,11 +10,16 @@ import re
 from yaml import safe_load
 
 import ladino.common
+import ladino.build
+from ladino.compress import compress_outputs
+from ladino.minify import minify_outputs
+from ladino.load.cache import open_cache, save_cache
 from ladino.load.dictionary import load_dictionary, load_config, Dictionary
 from ladino.load.examples import load_examples
-from ladino.export import generate_main_page, export_to_html, create_sitemap
+from ladino.export import generate_main_page, export_to_html, export_entities, create_sitemap, export_service_worker
 
 ladino.common.start = datetime.datetime.now().replace(microsecond=0)
+started = ladino.common.start
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -45,9 +50,19 @@ def get_args():
     action.add_argument("--main", action='store_true', help="Create the main page only")
     action.add_argument("--all",  action='store_true', help="Create all the pages")
 
+    parser.add_argument("--word", action="append", help="Re-render the pages of this Ladino word in an existing build")
+    parser.add_argument("--example", action="append", help="Re-render the pages of this example file in an existing build")
+
     parser.add_argument("--log", action="store_true", help="Additional logging")
     parser.add_argument("--pretty", action="store_true", help="Pretty save json files")
     parser.add_argument("--limit", type=int, help="Limit number of words")
+    parser.add_argument("--incremental", action="store_true", help="Only render the pages whose inputs changed since the previous build")
+    parser.add_argument("--minify", action="store_true", help="Remove the whitespace and comments from the generated html, css and js files")
+    parser.add_argument("--reproducible", action="store_true", help="Create the same files from the same input: use SOURCE_DATE_EPOCH (or 0) as the time of the build and leave out the GitHub run id")
+    parser.add_argument("--dictionary-patches", type=int, default=0, metavar="N", help="Keep the last N versions of dictionary.json and write a patch from each of them to the current one")
+    parser.add_argument("--page-size", type=int, default=500, metavar="N", help="The number of entries on every page of the listings of words, examples and messages")
+    parser.add_argument("--images", action="store_true", help="Create thumbnails and smaller copies of the WhatsApp and afish images (needs Pillow)")
+    parser.add_argument("--compress", action="store_true", help="Write gzip (and brotli) compressed copies of the larger files")
 
     args = parser.parse_args()
 
@@ -61,8 +76,29 @@ def get_args():
         parser.print_help()
         exit(1)
 
+    if args.page_size < 1:
+        print("\n* --page-size has to be at least 1\n")
+        parser.print_help()
+        exit(1)
+
+    if (args.word or args.example) and (args.main or args.all or not args.html or not args.dictionary):
+        print("\n* --word and --example need --html and --dictionary and cannot be used with --main or --all\n")
+        parser.print_help()
+        exit(1)
+
     return args
 
+def source_date(reproducible):
+    """
+    The time of the build. SOURCE_DATE_EPOCH is used when it is set, see https://reproducible-builds.org/specs/source-date-epoch/
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch is None and reproducible:
+        epoch = 0
+    if epoch is None:
+        return datetime.datetime.now().replace(microsecond=0)
+    return datetime.datetime.fromtimestamp(int(epoch), tz=datetime.timezone.utc).replace(tzinfo=None)
+
 def process_examples(dictionary, examples):
     # logging.info(f"examples: {examples}")
     # logging.info(f"dictionary.words: {dictionary.words}")
@@ -87,10 +123,16 @@ def main():
     if args.log:
         logging.basicConfig(level=logging.INFO)
     logging.info("Start generating Ladino dictionary website")
+    ladino.common.reproducible = args.reproducible
+    ladino.common.start = source_date(args.reproducible)
 
     if args.main:
         generate_main_page(args.html)
 
+    if args.html:
+        # Parsed yaml files are kept with the build state so the next build only parses what changed.
+        open_cache(os.path.join(ladino.build.state_dir(args.html), 'yaml.pickle'))
+
     if args.dictionary:
         path_to_repo = args.dictionary
         config = load_config(path_to_repo)
@@ -115,12 +157,29 @@ def main():
             sound_people = safe_load(fh)
 
     if args.all:
-        export_to_html(config, dictionary, examples, word_to_examples, sound_people, path_to_repo, args.html, whatsapp_dir=args.whatsapp, unafraza=args.unafraza, pages=args.pages, books=args.books, ladinadores=args.ladinadores, enkontros=args.enkontros, pretty=args.pretty)
+        export_to_html(config, dictionary, examples, word_to_examples, sound_people, path_to_repo, args.html, whatsapp_dir=args.whatsapp, unafraza=args.unafraza, pages=args.pages, books=args.books, ladinadores=args.ladinadores, enkontros=args.enkontros, pretty=args.pretty, incremental=args.incremental, minify=args.minify, patches=args.dictionary_patches, page_size=args.page_size, resize_images=args.images)
         create_sitemap(args.html)
+        if args.minify:
+            minify_outputs()
+        export_service_worker()
+        if args.compress:
+            compress_outputs()
+        ladino.build.finish()
+
+    if args.word or args.example:
+        export_entities(config, dictionary, examples, word_to_examples, sound_people, args.html, words=args.word, example_files=args.example, whatsapp_dir=args.whatsapp, unafraza=args.unafraza, ladinadores=args.ladinadores, pretty=args.pretty, minify=args.minify, patches=args.dictionary_patches, page_size=args.page_size, resize_images=args.images)
+        if args.minify:
+            minify_outputs()
+        export_service_worker()
+        if args.compress:
+            compress_outputs()
+        ladino.build.finish()
+
+    save_cache()
 
 
     end = datetime.datetime.now().replace(microsecond=0)
-    logging.info(f"Elapsed time: {(end-ladino.common.start).total_seconds()} sec")
+    logging.info(f"Elapsed time: {(end-started).total_seconds()} sec")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import ladino.build as build
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# name -> (the largest width, JPEG quality)
+variants = {
+    'thumb': (320, 80),
+    'web': (1024, 85),
+}
+
+def resize_image(source_path, cache_path, width, quality):
+    """
+    Save a copy of the image at most width pixels wide to cache_path, unless it is already there.
+    Return the size of the copy.
+    """
+    if os.path.exists(cache_path):
+        with Image.open(cache_path) as img:
+            return img.size
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width, img.height))
+        img = img.convert('RGB')
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        img.save(temp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        os.replace(temp_path, cache_path)
+        return img.size
+
+def export_images(images, target, processes=None):
+    """
+    Write a thumbnail and a smaller copy for the web of every image to img/{target}/{stem}-{variant}.jpg.
+    images maps the name of every image to the path of its file.
+    The copies are kept in the build state by the hash of the source image, so an image is only
+    resized again if it changed, even if the html directory was removed.
+
+    Return name -> variant -> {url, width, height} for the templates, or an empty dictionary if Pillow is not installed.
+    """
+    if Image is None:
+        logging.info("Pillow is not installed, the images are not resized")
+        return {}
+    logging.info(f"Resize {len(images)} images to img/{target}")
+    cache_dir = os.path.join(build.state_dir(build.target_path), 'images', target)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    found = {}
+    jobs = []
+    used = set()
+    for name, source_path in sorted(images.items()):
+        found[name] = {}
+        source_hash = build.file_hash(source_path)
+        stem = os.path.splitext(name)[0]
+        for variant, (width, quality) in variants.items():
+            filename = f"img/{target}/{stem}-{variant}.jpg"
+            source = f"{source_hash}-{width}-{quality}"
+            used.add(f"{source}.jpg")
+            previous = build.manifest.previous.get(filename)
+            if previous is not None and previous.get('source') == source and os.path.exists(os.path.join(build.html_path, filename)):
+                build.manifest.outputs[filename] = previous
+                found[name][variant] = {'url': f"/{filename}", 'width': previous['width'], 'height': previous['height']}
+                continue
+            jobs.append((name, variant, filename, source, (source_path, os.path.join(cache_dir, f"{source}.jpg"), width, quality)))
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        sizes = executor.map(resize_image, *zip(*[job[-1] for job in jobs])) if jobs else []
+        for (name, variant, filename, source, (_, cache_path, _, _)), (width, height) in zip(jobs, sizes):
+            with open(cache_path, 'rb') as fh:
+                data = fh.read()
+            build.write_bytes(filename, os.path.join(build.html_path, filename), data, hashlib.sha256(data).hexdigest(), {'source': source, 'width': width, 'height': height})
+            found[name][variant] = {'url': f"/{filename}", 'width': width, 'height': height}
+
+    for cached in os.listdir(cache_dir):
+        if cached not in used:
+            os.remove(os.path.join(cache_dir, cached))
+    logging.info(f"Wrote {len(jobs)} resized copies of images")
+    return found
@@ -1,5 +1,9 @@
 $(document).ready(function(){
-    var dictionary = null;
+    var full_dictionary = null;  // the promise of dictionary.json
+    var shards = null;           // dictionary/manifest.json, the list of the shards of dictionary.json
+    var dictionary = {};         // the shards loaded so far, in the same structure as dictionary.json
+    var shard_requests = {};
+    var translation = 0;         // only the translation of the latest text is shown
     var loaded = 0;
     const site = {
         'available_languages': ['rashi', 'inglez', 'fransez', 'ebreo', 'portugez', 'kasteyano', 'turko'],
@@ -82,7 +86,91 @@ $(document).ready(function(){
         return links;
     }
 
-    const display_lucky = function() {
+    // dictionary.json is kept in the local storage and only the changes are downloaded
+    // if there is a patch from the version we have to the current one.
+    function load_full_dictionary() {
+        if (! full_dictionary) {
+            full_dictionary = Promise.resolve($.getJSON("dictionary.version.json")).then(function(latest) {
+                const cached = get_cached_dictionary();
+                if (cached && cached["version"] == latest["version"]) {
+                    return cached["dictionary"];
+                }
+                if (cached && latest["patches"].includes(cached["version"])) {
+                    return Promise.resolve($.getJSON(`dictionary.patch.${cached["version"]}-${latest["version"]}.json`)).then(function(patch) {
+                        return cache_dictionary(latest["version"], apply_patch(cached["dictionary"], patch));
+                    });
+                }
+                return Promise.resolve($.getJSON(`dictionary.json?v=${latest["version"]}`)).then(function(data) {
+                    return cache_dictionary(latest["version"], data);
+                });
+            }).catch(function() {
+                return Promise.resolve($.getJSON("dictionary.json"));
+            }).catch(function() {
+                console.log("An error has occurred while loading dictionary.json");
+            });
+        }
+        return full_dictionary;
+    }
+
+    function get_cached_dictionary() {
+        try {
+            return JSON.parse(localStorage.getItem('dictionary'));
+        } catch (error) {
+            return null;
+        }
+    }
+
+    function cache_dictionary(version, dictionary) {
+        try {
+            localStorage.setItem('dictionary', JSON.stringify({'version': version, 'dictionary': dictionary}));
+        } catch (error) {
+            // the local storage is full
+            localStorage.removeItem('dictionary');
+        }
+        return dictionary;
+    }
+
+    function load_shard(language, word) {
+        const prefix = shard_prefix(word);
+        if (! shards["shards"][language] || ! shards["shards"][language].includes(prefix)) {
+            return Promise.resolve();
+        }
+        const name = `${language}/${prefix}`;
+        if (! (name in shard_requests)) {
+            shard_requests[name] = Promise.resolve($.getJSON(`dictionary/${name}.json?v=${shards["version"]}`)).then(function(data) {
+                Object.assign(dictionary[language], data);
+            });
+        }
+        return shard_requests[name];
+    }
+
+    // Load the shards needed to translate the text, or dictionary.json if there are no shards.
+    function load_translation(text, original_language, languages) {
+        if (! shards) {
+            return load_full_dictionary();
+        }
+        let loading;
+        if (original_language == "automatik" && shards["shards"]["any"]) {
+            // one lookup per word in the table of all the languages
+            const needed = any_shards(text);
+            loading = Promise.all(needed.map(([language, word]) => load_shard(language, word))).then(function() {
+                return Promise.all(expand_any(needed, dictionary, languages).map(([language, word]) => load_shard(language, word)));
+            });
+        } else {
+            const needed = source_shards(text, original_language, languages);
+            loading = Promise.all(needed.map(([language, word]) => load_shard(language, word))).then(function() {
+                return Promise.all(ladino_shards(needed, dictionary).map(([language, word]) => load_shard(language, word)));
+            });
+        }
+        return loading.then(function() {
+            return dictionary;
+        }).catch(function() {
+            console.log("An error has occurred while loading the shards of dictionary.json");
+            return load_full_dictionary();
+        });
+    }
+
+    const display_lucky = function(dictionary) {
         const words = Object.keys(dictionary["ladino"]);
         const word = words[Math.floor(Math.random() * words.length)];
         console.log(word);
@@ -115,7 +203,7 @@ $(document).ready(function(){
             localStorage.setItem('original', original_text);
         } else if ($('#lucky-search').prop('checked')) {
             hide_welcome();
-            display_lucky();
+            load_full_dictionary().then(display_lucky);
             return;
         } else {
             console.log('ohoh');
@@ -126,6 +214,23 @@ $(document).ready(function(){
         }
         hide_welcome();
 
+        const current = ++translation;
+        let original_language = $('#original-language').find(":selected").val();
+        let loading;
+        if ($('#single-search').prop('checked')) {
+            // looks for the text in every Ladino word
+            loading = load_full_dictionary();
+        } else {
+            loading = load_translation(original_text, original_language, languages);
+        }
+        loading.then(function(dictionary) {
+            if (current == translation) {
+                display_rows(original_text, original_language, languages, dictionary);
+            }
+        });
+    };
+
+    var display_rows = function(original_text, original_language, languages, dictionary) {
         let rows = [];
         let count;
         const row_limit = 20;
@@ -135,7 +240,6 @@ $(document).ready(function(){
             rows = rows.slice(0, row_limit);
             //console.log(count);
         } else if ($('#multi-search').prop('checked')) {
-            let original_language = $('#original-language').find(":selected").val();
             rows = translate(original_text, original_language, languages, dictionary);
         //} else if ($('#lucky-search').prop('checked')) {
         } else {
@@ -214,12 +318,16 @@ $(document).ready(function(){
 
         $("#output").html(html);
     };
-    $.getJSON("dictionary.json", function(data){
-        dictionary = data;
+    $.getJSON("dictionary/manifest.json", function(data){
+        shards = data;
+        for (const language in shards["shards"]) {
+            dictionary[language] = {};
+        }
+    }).fail(function(){
+        console.log("An error has occurred while loading dictionary/manifest.json, using dictionary.json");
+    }).always(function(){
         loaded++;
         try_translate();
-    }).fail(function(){
-        console.log("An error has occurred while loading dictionary.json");
     });
 
     $('#input-text').bind('input propertychange', display_translate);
@@ -290,6 +398,12 @@ $(document).ready(function(){
     }
 
     const start_game = function(status="") {
+        load_full_dictionary().then(function(dictionary) {
+            show_game_word(dictionary, status);
+        });
+    };
+
+    const show_game_word = function(dictionary, status) {
         //console.log("status: ", status);
 
         let stored = get_words();
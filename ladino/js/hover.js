@@ -1,57 +1,29 @@
 $(document).ready(function(){
-    //const words = ['aki', 'ay', 'algunas', 'palavras', 'biervos', 'mas'];
-    const dictionary = {
-        'aki': 'here',
-        'ay': 'there is',
-        'algunas': 'some',
-        'palavras': 'words',
-        'biervos': 'words',
-        'mas': 'more'
-    };
-    //$(".ladino").each(function() {
-    //    const elem = $(this);
-    //    var html = elem.html();
-    //    console.log(html);
-    //    html = html.replace(/(?<=^|[ >])([a-z]+)(?=[ <]|$)/g, `<span class="ladtr">$1</span>`);
-    //    console.log(html);
-    //    elem.html(html);
-    //});
+    // The translations of the Ladino words linked on this page, see page_glosses in ladino/export.py
+    const element = document.getElementById('glosses');
+    if (! element) {
+        return;
+    }
+    const glosses = JSON.parse(element.textContent);
 
-    $(".ladino").each(function() {
+    // The languages selected in the configuration of the converter
+    let languages = ['inglez', 'kasteyano', 'turko'];
+    const config_str = localStorage.getItem('config');
+    if (config_str) {
+        const lashon = JSON.parse(config_str)['lashon'];
+        languages = Object.keys(lashon).filter(language => lashon[language] == '1');
+    }
+
+    $('a[href^="/words/ladino/"]').each(function() {
         const elem = $(this);
-        var html = elem.html();
-        console.log(html);
-        html = html.replace(/(?<=^|[ >])([a-z]+)(?=[ <]|$)?/g, function (word) {
-            var trans = dictionary[word];
-            if (trans) {
-                return `<span title="${trans}">${word}</span>`;
-            } else {
-                return word;
-            }
-        });
-        console.log(html);
-        elem.html(html);
+        const gloss = glosses[elem.attr('href').substring('/words/ladino/'.length)];
+        if (! gloss) {
+            return;
+        }
+        let shown = languages.filter(language => gloss[language]);
+        if (shown.length == 0) {
+            shown = Object.keys(gloss);
+        }
+        elem.attr('title', shown.map(language => `${language}: ${gloss[language]}`).join("\n"));
     });
-
-    //$(".ladtr").mouseenter(function (event) {
-    //    console.log($(this).text());
-    //});
-
-    //    const words = elem.html().split(" ");
-    //    for (var ix=0; ix<words.length; ix++) {
-    //        console.log(words[ix]);
-    //    }
-    //    console.log('--');
-    //})
-    //let text = $(".ladino").html();
-    //const words = text.split(" ");
-    //    console.log(words[ix]);
-    //}
-    //    //$(".ladino").text($(".ladino").text().replace(words[ix], `<span class="ladtr">${words[ix]}</span>`));
-
-
-    //console.log(text);
-    //console.log(typeof(text));
-    //$("
 });
-
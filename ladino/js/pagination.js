@@ -0,0 +1,21 @@
+$(document).ready(function(){
+    // Offer to jump to any page of a paginated listing, see paginate in ladino/export.py
+    const nav = $('nav.pagination[data-index]');
+    if (nav.length == 0) {
+        return;
+    }
+    $.getJSON(nav.attr('data-index'), function(index) {
+        const select = $('<select>');
+        index['pages'].forEach(function(page, idx) {
+            const option = $('<option>').val(page['url']).text(`${idx + 1}: ${page['first']} - ${page['last']}`);
+            if (page['url'] == window.location.pathname) {
+                option.attr('selected', 'selected');
+            }
+            select.append(option);
+        });
+        select.on('change', function() {
+            window.location.href = select.val();
+        });
+        nav.append($('<div class="select is-small">').append(select));
+    });
+});
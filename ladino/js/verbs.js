@@ -73,4 +73,28 @@ function conjugations(verb) {
 
     return data
 }
+// The conjugations of the verbs in a shard of the bundle written by export_conjugation_bundle
+// in ladino/export.py: {verb: {tense: {pronoun: form}}}
+function expand_conjugations(manifest, shard) {
+    let verbs = {};
+    for (const verb in shard) {
+        verbs[verb] = {};
+        for (const [tense, pronoun, form] of shard[verb]) {
+            const tense_name = manifest['tenses'][tense];
+            if (! verbs[verb][tense_name]) {
+                verbs[verb][tense_name] = {};
+            }
+            verbs[verb][tense_name][manifest['pronouns'][pronoun]] = form;
+        }
+    }
+    return verbs;
+}
+
+// The shard of the bundle with the conjugations of the verb, if there is one.
+function conjugation_shard(manifest, verb) {
+    return manifest['shards'].find(shard => shard['first'] <= verb && verb <= shard['last']);
+}
+
 module.exports.conjugations = conjugations;
+module.exports.expand_conjugations = expand_conjugations;
+module.exports.conjugation_shard = conjugation_shard;
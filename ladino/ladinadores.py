@@ -6,7 +6,7 @@ def load_ladinadores(root):
     data = []
     images_dir = os.path.join(root, 'docs', 'afishes')
     yaml_dir = os.path.join(root, 'afishes')
-    for filename in os.listdir(yaml_dir):
+    for filename in sorted(os.listdir(yaml_dir)):
         # print(filename)
         img_filename = filename[0:-4] + 'jpg'
         # print(img_filename)
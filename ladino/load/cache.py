@@ -0,0 +1,50 @@
+import logging
+import os
+import pickle
+
+import yaml
+
+# Parsed yaml files of the previous build, so a targeted rebuild only parses the files that changed.
+# path -> (mtime_ns, size, pickled data)
+# The data is kept pickled as the loaders modify what they load.
+cache_file = None
+entries = {}
+used = set()
+
+Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def open_cache(path):
+    global cache_file, entries, used
+    cache_file = path
+    entries = {}
+    used = set()
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as fh:
+                entries = pickle.load(fh)
+        except Exception as err:
+            logging.info(f"Ignoring yaml cache {path}: {err}")
+
+def save_cache():
+    if cache_file is None:
+        return
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(cache_file, 'wb') as fh:
+        pickle.dump({key: entries[key] for key in used}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_yaml(path):
+    if cache_file is None:
+        with open(path) as fh:
+            return yaml.load(fh, Loader=Loader)
+
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    used.add(key)
+    entry = entries.get(key)
+    if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+        return pickle.loads(entry[2])
+
+    with open(path) as fh:
+        data = yaml.load(fh, Loader=Loader)
+    entries[key] = (stat.st_mtime_ns, stat.st_size, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    return data
@@ -6,6 +6,7 @@ import re
 import yaml
 
 from ladino.common import LadinoError, languages, words_to_url
+from ladino.load.cache import load_yaml
 
 VALID_FIELDS_IN_WORD_FILES = set(['conjugations', 'grammar', 'versions', 'id', 'orijen', 'kategorias', 'linguas', 'comments'])
 VALID_FIELDS_IN_VERSION = {'ladino', 'accented', 'rashi', 'gender', 'number', 'alternative-spelling', 'alternative-not-recommended', 'diminutivo-de', 'translations'}
@@ -171,7 +172,7 @@ def load_dictionary(config, limit, path_to_dictionary):
     irregulars = config['verbos-iregolares']
     count = 0
 
-    files = os.listdir(path_to_dictionary)
+    files = sorted(os.listdir(path_to_dictionary))
     for filename in files:
         if re.search(r'^\.[a-z_ -]+\.yaml\.swp$', filename):
             continue
@@ -184,8 +185,7 @@ def load_dictionary(config, limit, path_to_dictionary):
 
         path = os.path.join(path_to_dictionary, filename)
         logging.info(path)
-        with open(path) as fh:
-            data = yaml.safe_load(fh)
+        data = load_yaml(path)
 
         dictionary.yaml_files.append(data)
 
@@ -3,18 +3,18 @@ from yaml import safe_load
 import logging
 
 from ladino.common import LadinoError, languages, words_to_url
+from ladino.load.cache import load_yaml
 
 def load_examples(path_to_examples):
     logging.info(f"load_examples({path_to_examples})")
     all_examples = []
     if os.path.exists(path_to_examples):
-        for filename in os.listdir(path_to_examples):
+        for filename in sorted(os.listdir(path_to_examples)):
             if filename.endswith('.swp'):
                 continue
             logging.info(f"load_examples from '{filename}'")
             try:
-                with open(os.path.join(path_to_examples, filename)) as fh:
-                    example = safe_load(fh)
+                example = load_yaml(os.path.join(path_to_examples, filename))
             except Exception as err:
                 raise LadinoError(f"The example file '{filename}' is not a valid YAML file.")
 
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import ladino.build as build
+
+# Content of these elements is left exactly as it is.
+protected_html = re.compile(r'<(pre|textarea|script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# Before one of these a / starts a regular expression and not a division.
+regex_after_chars = set('(,=:[!&|?{};+-*%<>~^')
+regex_after_words = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'instanceof', 'yield', 'await'}
+
+
+def minify_html(text):
+    """
+    Remove the indentation and the empty lines outside of pre, textarea, script and style.
+    A run of whitespace with a newline in it becomes a single newline, which the browser
+    shows the same way, so whitespace between inline elements is kept.
+    """
+    parts = []
+    position = 0
+    for match in protected_html.finditer(text):
+        parts.append(collapse_lines(text[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(collapse_lines(text[position:]))
+    return ''.join(parts).strip() + '\n'
+
+
+def collapse_lines(text):
+    return re.sub(r'[ \t]*\n\s*', '\n', text)
+
+
+def split_code(text, regex_literals=False):
+    """
+    Split JavaScript or CSS into (is_code, text) pieces, so the whitespace and the comments
+    can be removed from the code without touching the strings and the regular expressions.
+    Comments are returned as pieces of whitespace. Return None if the text cannot be split,
+    e.g. because a string is not closed.
+    """
+    pieces = []
+    code = []
+    size = len(text)
+    i = 0
+    while i < size:
+        char = text[i]
+        if char == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            if end == -1:
+                return None
+            code.append('\n' if '\n' in text[i:end] else ' ')
+            i = end + 2
+        elif char == '/' and regex_literals and text.startswith('//', i):
+            end = text.find('\n', i)
+            i = size if end == -1 else end
+        elif char in '"\'`' or (char == '/' and regex_literals and starts_regex(''.join(code), after_literal=bool(pieces))):
+            end = end_of_literal(text, i)
+            if end is None:
+                return None
+            pieces.append((True, ''.join(code)))
+            pieces.append((False, text[i:end]))
+            code = []
+            i = end
+        else:
+            code.append(char)
+            i += 1
+    pieces.append((True, ''.join(code)))
+    return pieces
+
+
+def starts_regex(code, after_literal):
+    code = code.rstrip()
+    if code == '':
+        return not after_literal
+    if code[-1] in regex_after_chars:
+        return True
+    word = re.search(r'[A-Za-z_$]+$', code)
+    return word is not None and word.group(0) in regex_after_words
+
+
+def end_of_literal(text, start):
+    """
+    The index after the string, template literal or regular expression that starts at text[start].
+    """
+    quote = text[start]
+    in_class = False
+    i = start + 1
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '\n' and quote in '"\'/':
+            return None
+        if quote == '/' and char == '[':
+            in_class = True
+        elif quote == '/' and char == ']':
+            in_class = False
+        elif char == quote and not in_class:
+            return i + 1
+        i += 1
+    return None
+
+
+def minify_js(text):
+    """
+    Remove the comments, the indentation and the empty lines.
+    Newlines are kept so the automatic semicolon insertion works as before.
+    """
+    pieces = split_code(text, regex_literals=True)
+    if pieces is None:
+        return text
+    parts = []
+    for is_code, piece in pieces:
+        if is_code:
+            piece = re.sub(r'[ \t]+', ' ', collapse_lines(piece))
+        parts.append(piece)
+    return ''.join(parts).strip() + '\n'
+
+
+def minify_css(text):
+    pieces = split_code(text)
+    if pieces is None:
+        return text
+    parts = []
+    for is_code, piece in pieces:
+        if is_code:
+            piece = re.sub(r'\s+', ' ', piece)
+            piece = re.sub(r' ?([{};,>]) ?', r'\1', piece)
+            piece = piece.replace(';}', '}')
+        parts.append(piece)
+    return ''.join(parts).strip() + '\n'
+
+
+minifiers = {
+    '.html': minify_html,
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+def minify_file(full_path):
+    """
+    Minify the file in place. Return the hash of the new content and the number of bytes saved,
+    or None if minifying did not make the file smaller.
+    """
+    with open(full_path, 'rb') as fh:
+        data = fh.read()
+    minifier = minifiers[os.path.splitext(full_path)[1]]
+    minified = minifier(data.decode('utf-8')).encode('utf-8')
+    if len(minified) >= len(data):
+        return None
+    temp_path = f"{full_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as fh:
+        fh.write(minified)
+    os.replace(temp_path, full_path)
+    return hashlib.sha256(minified).hexdigest(), len(data) - len(minified)
+
+
+def minify_outputs(processes=None):
+    """
+    Minify the generated html, css and js files in place.
+    The manifest keeps the hash of the content as it was rendered, so unchanged pages are
+    still recognized by the next build, and the hash of the minified file under 'minified'.
+    Files that were already minified by the previous build are not minified again.
+    """
+    logging.info("Minify the generated files")
+    build.flush()
+    jobs = []
+    for filename, entry in sorted(build.manifest.outputs.items()):
+        if os.path.splitext(filename)[1] not in minifiers or 'minified' in entry:
+            continue
+        previous = build.manifest.previous.get(filename)
+        if previous is not None and 'minified' in previous and previous['hash'] == entry['hash'] and previous.get('mtime') == entry.get('mtime'):
+            entry['minified'] = previous['minified']
+            continue
+        jobs.append(filename)
+
+    saved = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        full_paths = [os.path.join(build.html_path, filename) for filename in jobs]
+        for filename, full_path, result in zip(jobs, full_paths, executor.map(minify_file, full_paths, chunksize=16)):
+            if result is None:
+                continue
+            content_hash, saved_bytes = result
+            saved += saved_bytes
+            build.drop_sidecars(filename, full_path)
+            stat = os.stat(full_path)
+            build.manifest.outputs[filename] = dict(build.manifest.outputs[filename], minified=content_hash, size=stat.st_size, mtime=stat.st_mtime_ns)
+    logging.info(f"Minified {len(jobs)} files, saved {saved} bytes")
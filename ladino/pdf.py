@@ -3,6 +3,8 @@ import os
 
 from reportlab.pdfgen import canvas
 
+import ladino.common as common
+
 def create_pdf_dictionaries(all_words, languages):
     for language in languages:
         create_pdf(all_words, 'ladino', language)
@@ -15,9 +17,10 @@ def create_pdf(all_words, source, target):
     os.makedirs(pdf_dir, exist_ok=True)
 
     pdf_file = os.path.join(pdf_dir, f'{source}-{target}.pdf')
-    now = datetime.datetime.now().replace(microsecond=0)
+    now = common.start or datetime.datetime.now().replace(microsecond=0)
 
-    can = canvas.Canvas(pdf_file)
+    # invariant leaves the creation date and the random document id out of the file
+    can = canvas.Canvas(pdf_file, invariant=int(common.reproducible))
 
     can.drawString(20, 800, f"Diksionaryo {source.capitalize()}-{target.capitalize()}")
     can.drawString(20, 780, f'Version de {now}')
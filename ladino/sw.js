@@ -0,0 +1,75 @@
+// The service worker of the site. export_service_worker in ladino/export.py writes it to /sw.js
+// with the version of /precache.json on the first line, so the browser installs it again whenever
+// one of the precached files changes.
+const precache_name = 'precache';
+const runtime_name = 'runtime';
+const runtime_limit = 500;  // the number of other responses kept for offline use
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(update_precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(self.clients.claim());
+});
+
+// Download only the files whose hash in precache.json changed since the previous version
+async function update_precache() {
+    const cache = await caches.open(precache_name);
+    const response = await fetch(`/precache.json?v=${version}`, {cache: 'no-cache'});
+    const latest = (await response.json())['files'];
+    const previous_response = await cache.match('/precache.json');
+    const previous = previous_response ? (await previous_response.json())['files'] : {};
+
+    for (const url of Object.keys(latest)) {
+        if (previous[url] === latest[url] && await cache.match(url)) {
+            continue;
+        }
+        const file = await fetch(url, {cache: 'reload'});
+        if (file.ok) {
+            await cache.put(url, file);
+        }
+    }
+    for (const url of Object.keys(previous)) {
+        if (! (url in latest)) {
+            await cache.delete(url);
+        }
+    }
+    await cache.put('/precache.json', new Response(JSON.stringify({'files': latest})));
+}
+
+self.addEventListener('fetch', function(event) {
+    const url = new URL(event.request.url);
+    if (event.request.method != 'GET' || url.origin != self.location.origin || url.pathname == '/sw.js') {
+        return;
+    }
+    event.respondWith(respond(event.request, url));
+});
+
+// The precached files are served from the cache, anything else from the network
+// and from the cache only if the network is not available.
+async function respond(request, url) {
+    const precache = await caches.open(precache_name);
+    const cached = await precache.match(url.pathname);
+    if (cached) {
+        return cached;
+    }
+    const runtime = await caches.open(runtime_name);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            await runtime.put(request, response.clone());
+            const keys = await runtime.keys();
+            for (const key of keys.slice(0, Math.max(0, keys.length - runtime_limit))) {
+                await runtime.delete(key);
+            }
+        }
+        return response;
+    } catch (error) {
+        const fallback = await runtime.match(request);
+        if (fallback) {
+            return fallback;
+        }
+        throw error;
+    }
+}
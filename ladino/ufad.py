@@ -7,7 +7,7 @@ def load_ufad(root):
     filepath = os.path.join(root, 'una-fraze-al-dia_lad-tur-eng-spa.csv')
     #print(filepath)
 
-    audios = os.listdir(os.path.join(root, 'ogg'))
+    audios = sorted(os.listdir(os.path.join(root, 'ogg')))
     #print(audios)
     #audios_lower_case = [name.lower() for name in audios]
     #print(audios_lower_case)
@@ -21,7 +21,7 @@ def load_videos(path):
 
     videos = []
 
-    for filename in os.listdir(os.path.join(path, 'videos')):
+    for filename in sorted(os.listdir(os.path.join(path, 'videos'))):
         logging.info(f"video: '{filename}'")
         with open(os.path.join(path, 'videos', filename)) as fh:
             header = {}
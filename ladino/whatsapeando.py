@@ -12,7 +12,7 @@ def get_messages(root):
         skip_image = safe_load(fh)
 
     entries = []
-    yaml_files = os.listdir(os.path.join(root, 'text'))
+    yaml_files = sorted(os.listdir(os.path.join(root, 'text')))
     #print(yaml_files)
     ogg_files = set(os.listdir(os.path.join(root, 'sound')))
     #print(ogg_files)
@@ -0,0 +1,22 @@
+assert = require('assert');
+const verbs = require('.././ladino/js/verbs');
+const fs = require('fs');
+const path = require('path');
+
+// The conjugation bundle has the same forms as the verbos/{verb}.json files.
+const verbs_dir = path.join(process.argv[2], 'verbos');
+const manifest = JSON.parse(fs.readFileSync(path.join(verbs_dir, 'conjugations', 'manifest.json'), 'utf8'));
+for (const filename of fs.readdirSync(verbs_dir).filter(name => name.endsWith('.json'))) {
+    const verb = filename.slice(0, -5);
+    const conjugations = JSON.parse(fs.readFileSync(path.join(verbs_dir, filename), 'utf8'));
+    let expected = {};
+    for (const tense in conjugations) {
+        expected[tense] = {};
+        for (const pronoun in conjugations[tense]) {
+            expected[tense][pronoun] = conjugations[tense][pronoun]['ladino'];
+        }
+    }
+    const shard = verbs.conjugation_shard(manifest, verb);
+    const bundle = JSON.parse(fs.readFileSync(path.join(process.argv[2], shard['file']), 'utf8'));
+    assert.deepStrictEqual(verbs.expand_conjugations(manifest, bundle)[verb], expected);
+}
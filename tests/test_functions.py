@@ -1,6 +1,184 @@
-from ladino.export import get_separate_words
+import collections
+import json
+import os
+import subprocess
+import sys
+
+import ladino.build
+import ladino.export
+from ladino.export import any_language_table, dictionary_letters, get_separate_words, is_streamed, json_chunks, link_words, page_glosses, export_conjugation_bundle, search_key, search_prefix, similar_words
+from ladino.minify import minify_html, minify_css, minify_js
 
 def test_get_separate_words():
     assert get_separate_words("una palavra") == {'una', 'palavra'}
     assert get_separate_words("una. palavra!") == {'una', 'palavra'}
     assert get_separate_words("una palavra i otra Palavra") == {'una', 'i', 'otra', 'palavra'}
+
+def test_is_streamed():
+    assert is_streamed("words/ladino/index.html")
+    assert is_streamed("egzempios/index.html")
+    assert not is_streamed("words/ladino/kaza.html")
+    assert not is_streamed("egzempios/yo-komo-pan.html")
+    assert not is_streamed("ladino-inglez/a.html")
+
+def test_dictionary_letters():
+    words = {'kaza': 1, 'komer': 2, 'akí': 3, 'ánjel': 4, 'ǵente': 5}
+    assert dictionary_letters(words) == [
+        ('a', 'a', {'akí': 3}),
+        ('k', 'k', {'kaza': 1, 'komer': 2}),
+        ('u00e1', 'á', {'ánjel': 4}),
+        ('u01f5', 'ǵ', {'ǵente': 5}),
+    ]
+
+def test_minify():
+    assert minify_html("<div>\n    <b>a</b>  <i>b</i>\n\n</div>\n<pre>\n  x\n</pre>\n") == "<div>\n<b>a</b>  <i>b</i>\n</div>\n<pre>\n  x\n</pre>\n"
+    assert minify_css("a , b {\n  color: red;\n  /* comment */\n  content: \"a ; b\";\n}\n") == 'a,b{color: red;content: "a ; b"}\n'
+    assert minify_js("// comment\nlet x = 'a  // b';\n    let y = text.replace(/[\"']/g, \" \"); /* z */\nlet z = x / 2;\n") == "let x = 'a  // b';\nlet y = text.replace(/[\"']/g, \" \");\nlet z = x / 2;\n"
+    assert minify_js("let x = 'not closed\n") == "let x = 'not closed\n"
+
+def test_json_chunks(monkeypatch):
+    monkeypatch.setattr(ladino.export, 'json_block_size', 2)
+    data = {
+        'ladino': {'kaza': ['house'], 'ágila': [], 'pan': {'inglez': 'bread', 'ebreo': 'לחם'}},
+        'empty': {},
+        'count': 3,
+        'list': [{'b': 1, 'a': [1, 2]}],
+    }
+    for pretty in [False, True]:
+        for depth in [0, 1, 2, 3]:
+            expected = json.dumps(data, indent=4 if pretty else None, ensure_ascii=False, sort_keys=True)
+            assert ''.join(json_chunks(data, pretty, depth)) == expected
+
+def test_page_glosses(monkeypatch):
+    monkeypatch.setattr(ladino.export, 'glossary', {
+        'kaza': {'accented': ['káza'], 'inglez': ['house'], 'kasteyano': ['casa'], 'turko': [], 'ladino': ['kaza']},
+        'grande': {'inglez': ['big', 'large']},
+    })
+    html = link_words("Tengo una kaza grande i una Kaza chika", {'kaza', 'grande', 'una'})
+    assert page_glosses(html) == {
+        'kaza': {'inglez': 'house', 'kasteyano': 'casa'},
+        'grande': {'inglez': 'big, large'},
+    }
+
+def test_conjugation_bundle(tmpdir, monkeypatch):
+    monkeypatch.setattr(ladino.build, 'html_path', str(tmpdir))
+    monkeypatch.setattr(ladino.export, 'verb_shard_size', 100)
+    config = {'tiempos': ['prezente', 'pasado'], 'pronombres': ['yo', 'tu']}
+    verbs = []
+    for verb in ['komer', 'bever', 'korrer', 'meter', 'vender']:
+        root = verb[0:-2]
+        verbs.append({'versions': [{'ladino': verb}], 'conjugations': {
+            'prezente': {'yo': {'ladino': root + 'o'}, 'tu': {'ladino': root + 'es'}},
+            'pasado': {'tu': {'ladino': root + 'ites'}},
+        }})
+    export_conjugation_bundle(config, verbs)
+
+    with open(os.path.join(tmpdir, 'verbos', 'conjugations', 'manifest.json')) as fh:
+        manifest = json.load(fh)
+    assert manifest['tenses'] == ['prezente', 'pasado']
+    assert manifest['pronouns'] == ['yo', 'tu']
+    assert len(manifest['shards']) > 1
+    bundle = {}
+    for shard in manifest['shards']:
+        with open(os.path.join(tmpdir, shard['file'][1:])) as fh:
+            data = json.load(fh)
+        assert shard['first'] == min(data) and shard['last'] == max(data) and shard['verbs'] == len(data)
+        bundle.update(data)
+    assert sorted(bundle) == ['bever', 'komer', 'korrer', 'meter', 'vender']
+    assert bundle['komer'] == [[0, 0, 'komo'], [0, 1, 'komes'], [1, 1, 'komites']]
+
+def test_search_key():
+    assert search_key('Aftahá') == 'aftaha'
+    assert search_key('Şehir') == 'sehir'
+    assert search_key('İstanbul') == 'istanbul'
+    assert search_key('שָׁלוֹם') == 'שלום'
+    assert search_prefix('kaza') == 'ka'
+    assert search_prefix('k') == 'k'
+    assert search_prefix('ıs') == 'u0131s'
+    assert search_prefix('a la') == 'au0020'
+    assert search_prefix('') == '_'
+
+def test_any_language_table():
+    word_mapping = {
+        'ladino': {'kaza': {}, 'kumer': {}},
+        'accented': {'kumér': ['kumer']},
+        'inglez': {'house': ['kaza'], 'eat': ['kumer']},
+        'kasteyano': {'casa': ['kaza'], 'comer': ['kumer'], 'Comér': ['kumer']},
+    }
+    table = any_language_table(word_mapping)
+    assert table['kaza'] == [['ladino', 'kaza', ['kaza']]]
+    assert table['kumer'] == [['ladino', 'kumer', ['kumer']], ['accented', 'kumér', ['kumer']]]
+    assert table['comer'] == [['kasteyano', 'comer', ['kumer']], ['kasteyano', 'Comér', ['kumer']]]
+    assert table['house'] == [['inglez', 'house', ['kaza']]]
+
+def test_similar_words(monkeypatch):
+    words = ['espital', 'ispital', 'ospital', 'eshpital', 'kaza', 'kazas', 'kyen']
+    similar = similar_words(words)
+    assert similar['espital'][0:2] == ['ispital', 'ospital']
+    assert set(similar['espital']) == {'ispital', 'ospital', 'eshpital'}
+    assert similar['kaza'] == ['kazas']
+    assert 'kyen' not in similar
+
+    # N-grams in more than similar_max_postings words do not make words similar
+    monkeypatch.setattr(ladino.export, 'similar_max_postings', 1)
+    assert similar_words(words) == {}
+
+def test_staging(tmpdir, monkeypatch):
+    html_dir = os.path.join(tmpdir, 'html')
+    staging = ladino.build.staging_dir(html_dir)
+    for path, content in [('same.html', 'same'), ('changed.html', 'new'), ('sub/page.html', 'page')]:
+        os.makedirs(os.path.dirname(os.path.join(html_dir, path)), exist_ok=True)
+        with open(os.path.join(html_dir, path), 'w') as fh:
+            fh.write(content)
+    ladino.build.prepare_staging(html_dir, staging)
+    same = os.stat(os.path.join(staging, 'same.html')).st_ino
+    assert same == os.stat(os.path.join(html_dir, 'same.html')).st_ino
+
+    # The staging directory of the previous build is brought up to date
+    os.replace(os.path.join(staging, 'sub', 'page.html'), os.path.join(staging, 'gone.html'))
+    with open(os.path.join(html_dir, 'changed.html.tmp'), 'w') as fh:
+        fh.write('newer')
+    os.replace(os.path.join(html_dir, 'changed.html.tmp'), os.path.join(html_dir, 'changed.html'))
+    ladino.build.prepare_staging(html_dir, staging)
+    assert os.stat(os.path.join(staging, 'same.html')).st_ino == same
+    assert not os.path.exists(os.path.join(staging, 'gone.html'))
+    with open(os.path.join(staging, 'changed.html')) as fh:
+        assert fh.read() == 'newer'
+    assert os.path.exists(os.path.join(staging, 'sub', 'page.html'))
+
+    # The swap keeps the old content in the staging directory
+    with open(os.path.join(staging, 'changed.html.tmp'), 'w') as fh:
+        fh.write('newest')
+    os.replace(os.path.join(staging, 'changed.html.tmp'), os.path.join(staging, 'changed.html'))
+    monkeypatch.setattr(ladino.build, 'html_path', staging)
+    monkeypatch.setattr(ladino.build, 'target_path', html_dir)
+    ladino.build.swap_in_staging()
+    with open(os.path.join(html_dir, 'changed.html')) as fh:
+        assert fh.read() == 'newest'
+    with open(os.path.join(staging, 'changed.html')) as fh:
+        assert fh.read() == 'newer'
+
+def test_fingerprint():
+    templates = {'word.html': 'abc'}
+    args = {'word': {'source': 'kaza.yaml', 'versions': [{'ladino': 'kaza'}]}, 'count': 3}
+    inputs, sources = ladino.build.fingerprint('words/ladino/kaza.html', templates, args)
+    assert sources == ['kaza.yaml']
+    assert ladino.build.fingerprint('words/ladino/kaza.html', templates, dict(args))[0] == inputs
+    changed = {'word': {'source': 'kaza.yaml', 'versions': [{'ladino': 'kazas'}]}, 'count': 3}
+    assert ladino.build.fingerprint('words/ladino/kaza.html', templates, changed)[0] != inputs
+    assert ladino.build.fingerprint('words/ladino/kaza.html', templates, dict(args, count='3'))[0] != inputs
+
+def test_fingerprint_views():
+    # ChainMap and other mappings are hashed by their content, sets in a stable order
+    code = (
+        "import collections, ladino.build; "
+        "word = collections.ChainMap({'source': 'kaza.yaml'}, {'ladino': 'kaza'}); "
+        "print(ladino.build.fingerprint('x.html', {}, {'word': word, 'missing': {'pero', 'kaza', 'mi', 'tu', 'grande'}}))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = set()
+    for seed in ['1', '2', '3']:
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, env=dict(os.environ, PYTHONHASHSEED=seed), capture_output=True, text=True, check=True)
+        outputs.add(result.stdout)
+    assert len(outputs) == 1
+    assert "['kaza.yaml']" in outputs.pop()
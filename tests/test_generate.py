@@ -4,11 +4,16 @@ import os
 import shutil
 import pytest
 import glob
+import hashlib
+import gzip
+import re
 
+import app
 from ladino.generate import main
 from ladino.load.dictionary import load_dictionary, load_config
 from ladino.load.examples import load_examples
 from ladino.common import LadinoError
+import ladino.export
 
 root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -24,8 +29,9 @@ def test_no_params():
     main()
 
 @pytest.mark.parametrize("name", ['good', 'real'])
-def test_one(tmpdir, request, name):
+def test_one(tmpdir, request, name, monkeypatch):
     print(tmpdir)
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1656633600')
 
     # export in case we would like to update the files in the files/good_output/ directory
     save = request.config.getoption("--save")
@@ -35,7 +41,7 @@ def test_one(tmpdir, request, name):
         html_dir = os.path.join(tmpdir, 'html')
     os.makedirs(html_dir, exist_ok=True)
 
-    sys.argv = [sys.argv[0], '--all', '--html',  html_dir, '--dictionary', os.path.join(root, 'files', name, 'data'), '--pretty']
+    sys.argv = [sys.argv[0], '--all', '--html',  html_dir, '--dictionary', os.path.join(root, 'files', name, 'data'), '--pretty', '--reproducible']
     if name == 'real':
         sys.argv.extend(['--whatsapp', 'files/real/estamos-whatsapeando/'])
         sys.argv.extend(['--unafraza', 'files/real/una-fraza-al-diya/'])
@@ -45,17 +51,16 @@ def test_one(tmpdir, request, name):
     print(sys.argv)
     main()
 
-    if len(os.listdir(os.path.join(html_dir, 'verbos'))) == 0:
-        os.rmdir(os.path.join(html_dir, 'verbos'))
-    shutil.rmtree(os.path.join(html_dir, 'hunspell'))
-    os.unlink(os.path.join(html_dir, 'statistika.html')) # has the date of generation in it
-    os.unlink(os.path.join(html_dir, 'dictionaries.html')) # has changing link in it
-    os.unlink(os.path.join(html_dir, 'echar-lashon.html')) # has changing date in it
-
     if not save:
-        cmd = f"diff -r {os.path.join(root, 'files', name, 'output')} {os.path.join(tmpdir, 'html')}"
-        print(cmd)
-        assert os.system(cmd) == 0
+        with open(os.path.join(root, 'files', name, 'output', 'manifest.json')) as fh:
+            expected = json.load(fh)
+        with open(os.path.join(html_dir, 'manifest.json')) as fh:
+            manifest = json.load(fh)
+        if manifest != expected:
+            cmd = f"diff -r {os.path.join(root, 'files', name, 'output')} {html_dir}"
+            print(cmd)
+            os.system(cmd)
+        assert manifest == expected
 
 @pytest.mark.parametrize("name,expected", [
     ('has_examples_field', "Invalid fields '{'examples'}' found in 'has_examples_field.yaml'"),
@@ -102,3 +107,328 @@ def test_bad_examples(tmpdir, name, expected):
     assert err.type == LadinoError
     assert str(err.value) == expected
 
+
+def test_incremental(tmpdir, monkeypatch):
+    # statistika.html has the time of the build in it
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1656633600')
+    data_dir = os.path.join(tmpdir, 'data')
+    shutil.copytree(os.path.join(root, 'files', 'good', 'data'), data_dir)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', data_dir, '--pretty']
+    main()
+
+    untouched = os.path.join(html_dir, 'words', 'ladino', 'estambol.html')
+    changed = os.path.join(html_dir, 'words', 'ladino', 'kaza.html')
+    orphan = os.path.join(html_dir, 'words', 'ladino', 'klaro.html')
+    mtime = os.stat(untouched).st_mtime_ns
+
+    # Files with unchanged content are not written again, not even in a full build
+    stray = os.path.join(html_dir, 'stray.html')
+    with open(stray, 'w') as fh:
+        fh.write('not generated')
+    main()
+    assert os.stat(untouched).st_mtime_ns == mtime
+    assert not os.path.exists(stray)
+    # The previous content is kept in the staging directory for the next build
+    assert os.path.exists(os.path.join(tmpdir, '.html.staging', 'stray.html'))
+
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml')) as fh:
+        kaza = fh.read()
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml'), 'w') as fh:
+        fh.write(kaza.replace('inglez: house', 'inglez: home'))
+    assert os.path.exists(orphan)
+    os.unlink(os.path.join(data_dir, 'words', 'minimal.yaml'))
+
+    main_incremental = sys.argv + ['--incremental']
+    sys.argv = main_incremental
+    main()
+
+    assert os.stat(untouched).st_mtime_ns == mtime
+    with open(changed) as fh:
+        assert 'home' in fh.read()
+    assert not os.path.exists(orphan)
+
+    # The incremental build is the same as a full build of the same data
+    full_dir = os.path.join(tmpdir, 'full')
+    os.makedirs(full_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', full_dir, '--dictionary', data_dir, '--pretty']
+    main()
+    assert os.system(f"diff -r {html_dir} {full_dir}") == 0
+
+def test_targeted(tmpdir):
+    data_dir = os.path.join(tmpdir, 'data')
+    shutil.copytree(os.path.join(root, 'files', 'good', 'data'), data_dir)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', data_dir]
+    main()
+
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml')) as fh:
+        kaza = fh.read()
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml'), 'w') as fh:
+        fh.write(kaza.replace('inglez: house', 'inglez: home'))
+    untouched = os.path.join(html_dir, 'words', 'ladino', 'estambol.html')
+    mtime = os.stat(untouched).st_mtime_ns
+
+    sys.argv = [sys.argv[0], '--html', html_dir, '--dictionary', data_dir, '--word', 'kaza']
+    main()
+    assert os.stat(untouched).st_mtime_ns == mtime
+
+    full_dir = os.path.join(tmpdir, 'full')
+    os.makedirs(full_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', full_dir, '--dictionary', data_dir]
+    main()
+    for filename in ['words/ladino/kaza.html', 'words/ladino/kaza.json', 'gramer/na.html', 'orijenes/jeneral.html', 'egzempios/mi-kaza-es-tu-kaza.html', 'dictionary.json', 'similar.json', 'sitemap.xml']:
+        with open(os.path.join(html_dir, filename)) as fh:
+            targeted = fh.read()
+        with open(os.path.join(full_dir, filename)) as fh:
+            assert targeted == fh.read(), filename
+    # Only the shards of the changed words were written again, but all of them are up to date
+    for dirname in ['dictionary', 'search']:
+        assert os.system(f"diff -r {os.path.join(html_dir, dirname)} {os.path.join(full_dir, dirname)}") == 0
+
+def test_compress(tmpdir):
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data'), '--compress']
+    main()
+
+    with open(os.path.join(html_dir, 'dictionary.json'), 'rb') as fh:
+        content = fh.read()
+    with gzip.open(os.path.join(html_dir, 'dictionary.json.gz')) as fh:
+        assert fh.read() == content
+    assert not os.path.exists(os.path.join(html_dir, 'robots.txt.gz'))
+
+    # Unchanged files are not compressed again
+    mtime = os.stat(os.path.join(html_dir, 'dictionary.json.gz')).st_mtime_ns
+    main()
+    assert os.stat(os.path.join(html_dir, 'dictionary.json.gz')).st_mtime_ns == mtime
+
+    app.root = html_dir
+    client = app.app.test_client()
+    response = client.get('/dictionary.json', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'application/json'
+    assert gzip.decompress(response.data) == content
+    response = client.get('/dictionary.json')
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == content
+
+def test_stale_sidecars(tmpdir):
+    data_dir = os.path.join(tmpdir, 'data')
+    shutil.copytree(os.path.join(root, 'files', 'good', 'data'), data_dir)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', data_dir, '--compress']
+    main()
+    assert os.path.exists(os.path.join(html_dir, 'words', 'ladino', 'kaza.html.gz'))
+
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml')) as fh:
+        kaza = fh.read()
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml'), 'w') as fh:
+        fh.write(kaza.replace('inglez: house', 'inglez: home'))
+    sys.argv = [sys.argv[0], '--html', html_dir, '--dictionary', data_dir, '--word', 'kaza']
+    main()
+
+    with open(os.path.join(html_dir, 'words', 'ladino', 'kaza.html'), 'rb') as fh:
+        content = fh.read()
+    assert b'home' in content
+    app.root = html_dir
+    client = app.app.test_client()
+    response = client.get('/words/ladino/kaza', headers={'Accept-Encoding': 'gzip, br'})
+    if 'Content-Encoding' in response.headers:
+        assert gzip.decompress(response.data) == content
+    else:
+        assert response.data == content
+    with open(os.path.join(ladino.build.state_dir(html_dir), 'manifest.json')) as fh:
+        assert 'words/ladino/kaza.html.gz' not in json.load(fh)['outputs']
+
+def test_minify(tmpdir):
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data'), '--pretty', '--minify', '--incremental']
+    main()
+    good_dir = os.path.join(root, 'files', 'good', 'output')
+    for filename in ['index.html', 'css/style.css', 'js/ladino.js']:
+        assert os.path.getsize(os.path.join(html_dir, filename)) < os.path.getsize(os.path.join(good_dir, filename)), filename
+
+    # Minified files are left alone by the next minified build
+    mtime = os.stat(os.path.join(html_dir, 'index.html')).st_mtime_ns
+    main()
+    assert os.stat(os.path.join(html_dir, 'index.html')).st_mtime_ns == mtime
+
+    # and written again by a build that does not minify
+    sys.argv.remove('--minify')
+    main()
+    for filename in ['index.html', 'css/style.css', 'js/ladino.js']:
+        with open(os.path.join(html_dir, filename)) as fh:
+            content = fh.read()
+        with open(os.path.join(good_dir, filename)) as fh:
+            assert content == fh.read(), filename
+
+def test_service_worker(tmpdir):
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data'), '--minify']
+    main()
+
+    with open(os.path.join(html_dir, 'precache.json'), 'rb') as fh:
+        data = fh.read()
+    with open(os.path.join(html_dir, 'sw.js')) as fh:
+        assert fh.readline() == f"const version = '{hashlib.sha256(data).hexdigest()[0:8]}';\n"
+    files = json.loads(data)['files']
+    with open(os.path.join(html_dir, 'assets.json')) as fh:
+        assets = json.load(fh)
+    assert set(files.keys()) == {f"/{path}" for path in assets.values()} | {'/', '/verbos/', '/dictionary/manifest.json', '/search/manifest.json', '/verbos/conjugations/manifest.json'}
+    # The hashes of the minified files
+    for url, filename in [('/', 'index.html'), (f"/{assets['js/ladino.js']}", assets['js/ladino.js']), ('/dictionary/manifest.json', 'dictionary/manifest.json')]:
+        with open(os.path.join(html_dir, filename), 'rb') as fh:
+            assert files[url] == hashlib.sha256(fh.read()).hexdigest()[0:16], url
+
+def test_split_sitemap(tmpdir, monkeypatch):
+    monkeypatch.setattr(ladino.export, 'sitemap_limit', 10)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data')]
+    main()
+
+    with open(os.path.join(html_dir, 'sitemap.xml')) as fh:
+        parts = re.findall(r'<loc>https://kantoniko.com/(sitemap-\d+\.xml)</loc><lastmod>\d{4}-\d\d-\d\d</lastmod>', fh.read())
+    assert len(parts) > 1
+    urls = []
+    for filename in parts:
+        with open(os.path.join(html_dir, filename)) as fh:
+            found = re.findall(r'<loc>https://kantoniko.com/(.*?)</loc><lastmod>', fh.read())
+        assert 0 < len(found) <= 10
+        urls.extend(found)
+    with open(os.path.join(root, 'files', 'good', 'output', 'sitemap-1.xml')) as fh:
+        assert urls == re.findall(r'<loc>https://kantoniko.com/(.*?)</loc>', fh.read())
+
+    app.root = html_dir
+    response = app.app.test_client().get(f"/{parts[0]}")
+    assert response.status_code == 200
+    assert b'<urlset' in response.data
+
+def test_dictionary_patches(tmpdir):
+    data_dir = os.path.join(tmpdir, 'data')
+    shutil.copytree(os.path.join(root, 'files', 'good', 'data'), data_dir)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', data_dir, '--dictionary-patches', '2']
+    main()
+    with open(os.path.join(html_dir, 'dictionary.version.json')) as fh:
+        first = json.load(fh)
+    assert first['patches'] == []
+    shutil.copy(os.path.join(html_dir, 'dictionary.json'), os.path.join(tmpdir, 'first.json'))
+
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml')) as fh:
+        kaza = fh.read()
+    with open(os.path.join(data_dir, 'words', 'kaza.yaml'), 'w') as fh:
+        fh.write(kaza.replace('inglez: house', 'inglez: home'))
+    os.unlink(os.path.join(data_dir, 'words', 'minimal.yaml'))
+    main()
+
+    with open(os.path.join(html_dir, 'dictionary.version.json')) as fh:
+        second = json.load(fh)
+    assert second['patches'] == [first['version']]
+    patch_file = os.path.join(html_dir, f"dictionary.patch.{first['version']}-{second['version']}.json")
+    with open(patch_file) as fh:
+        patch = json.load(fh)
+    assert patch['removed']['ladino'] == ['klaro']
+    assert patch['changed']['ladino']['kaza']['inglez'] == ['home']
+    assert patch['added']['inglez'] == {'home': ['kaza']}
+    assert os.system(f"node tests/test_patch.js {os.path.join(tmpdir, 'first.json')} {patch_file} {os.path.join(html_dir, 'dictionary.json')}") == 0
+
+def test_pagination(tmpdir):
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data'), '--page-size', '3']
+    main()
+
+    with open(os.path.join(html_dir, 'words', 'ladino', 'pajina', 'index.json')) as fh:
+        index = json.load(fh)['pages']
+    assert len(index) > 2
+    assert index[0]['url'] == '/words/ladino/'
+    assert index[1]['url'] == '/words/ladino/pajina/2'
+    assert all(page['count'] == 3 for page in index[0:-1])
+    assert all(earlier['last'] < later['first'] for earlier, later in zip(index, index[1:]))
+
+    words = []
+    for number, page in enumerate(index, start=1):
+        filename = 'index.html' if number == 1 else os.path.join('pajina', f'{number}.html')
+        with open(os.path.join(html_dir, 'words', 'ladino', filename)) as fh:
+            html = fh.read()
+        found = re.findall(r'<td><a href="/words/ladino/([^"]+)">', html)
+        assert found[0] == page['first'] and found[-1] == page['last']
+        words.extend(found)
+        assert ('<link rel="prev" href="' in html) == (number > 1)
+        assert ('<link rel="next" href="' in html) == (number < len(index))
+        assert 'data-index="/words/ladino/pajina/index.json"' in html
+    assert words == sorted(words)
+    assert len(words) == len(set(words))
+
+def test_word_reference_pages(tmpdir, monkeypatch):
+    monkeypatch.setattr(ladino.export, 'word_reference_limit', 1)
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'good', 'data'), '--page-size', '2']
+    main()
+
+    with open(os.path.join(root, 'files', 'good', 'output', 'words', 'ladino', 'kaza.html')) as fh:
+        expected = re.findall(r'<li><a href="(/egzempios/[^"]+)">', fh.read())
+    assert len(expected) == 3
+
+    links = []
+    for filename in ['kaza.html', os.path.join('kaza', 'egzempios-2.html')]:
+        with open(os.path.join(html_dir, 'words', 'ladino', filename)) as fh:
+            links.append(re.findall(r'<li><a href="(/egzempios/[^"]+)">', fh.read()))
+    assert [len(found) for found in links] == [1, 2]
+    assert sum(links, []) == expected
+    assert not os.path.exists(os.path.join(html_dir, 'words', 'ladino', 'kaza', 'egzempios-3.html'))
+    assert not os.path.exists(os.path.join(html_dir, 'words', 'ladino', 'biervo'))
+
+def test_images(tmpdir):
+    Image = pytest.importorskip("PIL.Image")
+    html_dir = os.path.join(tmpdir, 'html')
+    os.makedirs(html_dir)
+    sys.argv = [sys.argv[0], '--all', '--html', html_dir, '--dictionary', os.path.join(root, 'files', 'real', 'data'),
+        '--whatsapp', os.path.join(root, 'files', 'real', 'estamos-whatsapeando'),
+        '--sounds', os.path.join(root, 'files', 'real', 'sounds'),
+        '--ladinadores', os.path.join(root, 'files', 'real', 'los-ladinadores'), '--images']
+    main()
+
+    thumb = os.path.join(html_dir, 'img', 'afishes', 'aktividades-1-thumb.jpg')
+    web = os.path.join(html_dir, 'img', 'afishes', 'aktividades-1-web.jpg')
+    with Image.open(thumb) as img:
+        width, height = img.size
+    assert width == 320
+    with Image.open(web) as img:
+        assert img.width <= 1024
+    with open(os.path.join(html_dir, 'afishes', 'index.html')) as fh:
+        assert f'<img src="/img/afishes/aktividades-1-thumb.jpg" width="{width}" height="{height}"' in fh.read()
+    with open(os.path.join(html_dir, 'afishes', 'aktividades-1.html')) as fh:
+        assert '<img src="/img/afishes/aktividades-1-web.jpg"' in fh.read()
+    with open(os.path.join(html_dir, 'whatsapeando', 'akel-tyempo-ojo-malo.html')) as fh:
+        assert '<img src="/img/whatsapeando/akel-tyempo-ojo-malo-web.jpg"' in fh.read()
+    assert os.path.exists(os.path.join(html_dir, 'img', 'whatsapeando', 'akel-tyempo-ya-vino-la-ora-1-thumb.jpg'))
+
+    app.root = html_dir
+    client = app.app.test_client()
+    response = client.get('/img/afishes/aktividades-1-thumb.jpg')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    with open(thumb, 'rb') as fh:
+        assert response.data == fh.read()
+
+    # Unchanged images are not resized again, not even if the html directory is removed
+    cache_dir = os.path.join(tmpdir, '.html.build', 'images', 'afishes')
+    cached = {filename: os.stat(os.path.join(cache_dir, filename)).st_mtime_ns for filename in os.listdir(cache_dir)}
+    assert len(cached) == 2
+    mtime = os.stat(thumb).st_mtime_ns
+    main()
+    assert os.stat(thumb).st_mtime_ns == mtime
+    shutil.rmtree(html_dir)
+    main()
+    assert os.path.exists(thumb)
+    assert {filename: os.stat(os.path.join(cache_dir, filename)).st_mtime_ns for filename in os.listdir(cache_dir)} == cached
@@ -3,3 +3,15 @@ import os
 
 def test_js():
     assert os.system("node tests/test_verbs.js") == 0
+
+def test_shards():
+    assert os.system("node tests/test_shards.js files/good/output") == 0
+    assert os.system("node tests/test_shards.js files/real/output") == 0
+
+def test_conjugations():
+    assert os.system("node tests/test_conjugations.js files/good/output") == 0
+    assert os.system("node tests/test_conjugations.js files/real/output") == 0
+
+def test_search():
+    assert os.system("node tests/test_search.js files/good/output") == 0
+    assert os.system("node tests/test_search.js files/real/output") == 0
@@ -0,0 +1,15 @@
+assert = require('assert');
+const ladino = require('.././ladino/js/ladino');
+const fs = require('fs');
+
+// Applying the patch to the old version of dictionary.json has to give the new version.
+const [old_file, patch_file, new_file] = process.argv.slice(2);
+const old = JSON.parse(fs.readFileSync(old_file, 'utf8'));
+const patch = JSON.parse(fs.readFileSync(patch_file, 'utf8'));
+const expected = JSON.parse(fs.readFileSync(new_file, 'utf8'));
+
+const patched = ladino.apply_patch(old, patch);
+assert.deepStrictEqual(patched, expected);
+for (const language in expected) {
+    assert.deepStrictEqual(Object.keys(patched[language]), Object.keys(expected[language]));
+}
@@ -0,0 +1,47 @@
+assert = require('assert');
+const search = require('.././ladino/js/search');
+const fs = require('fs');
+const path = require('path');
+
+// The keys and the prefixes written by export_search_index have to be the same as the ones search.js computes.
+const html_dir = process.argv[2];
+const manifest = JSON.parse(fs.readFileSync(path.join(html_dir, 'search', 'manifest.json'), 'utf8'));
+const full = JSON.parse(fs.readFileSync(path.join(html_dir, 'dictionary.json'), 'utf8'));
+
+let count = 0;
+for (const prefix of manifest['prefixes']) {
+    const shard = JSON.parse(fs.readFileSync(path.join(html_dir, 'search', `${prefix}.json`), 'utf8'));
+    for (const [key, word, language, targets] of shard) {
+        assert.equal(search.search_key(word), key);
+        assert.equal(search.search_prefix(key), prefix);
+        assert.ok(language in full);
+        for (const target of targets) {
+            assert.ok(target in full['ladino'], target);
+        }
+        assert.deepEqual(search.search_matches(shard, word.toUpperCase(), shard.length).filter(entry => entry[1] == word && entry[2] == language), [[key, word, language, targets]]);
+        count++;
+    }
+}
+assert.ok(count > 0);
+
+// Every Ladino word with a page can be found
+for (const word of Object.keys(full['ladino'])) {
+    const prefix = search.search_prefix(search.search_key(word));
+    if (manifest['prefixes'].includes(prefix)) {
+        const shard = JSON.parse(fs.readFileSync(path.join(html_dir, 'search', `${prefix}.json`), 'utf8'));
+        assert.ok(search.search_matches(shard, word, shard.length).some(entry => entry[2] == 'ladino' && entry[1] == word), word);
+    }
+}
+
+assert.equal(search.search_key('Aftahá'), 'aftaha');
+assert.equal(search.search_key('Şehir'), 'sehir');
+assert.equal(search.search_prefix('kaza'), 'ka');
+assert.equal(search.search_prefix('ıs'), 'u0131s');
+assert.equal(search.search_prefix(''), '_');
+
+// Words of one letter are in shards of their own
+assert.equal(search.search_shard('a', ['a', 'ab']), 'a');
+assert.equal(search.search_shard('ab', ['a', 'ab']), 'ab');
+assert.equal(search.search_shard('i', ['a', 'ab']), null);
+assert.equal(search.search_shard('', ['_']), null);
+assert.deepEqual(search.search_matches([['a', 'a', 'ladino', ['a']]], 'A', 20), [['a', 'a', 'ladino', ['a']]]);
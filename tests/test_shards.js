@@ -0,0 +1,51 @@
+assert = require('assert');
+const ladino = require('.././ladino/js/ladino');
+const fs = require('fs');
+const path = require('path');
+
+// Translating with the shards of dictionary.json has to give the same as translating with the whole file.
+const html_dir = process.argv[2];
+const full = JSON.parse(fs.readFileSync(path.join(html_dir, 'dictionary.json'), 'utf8'));
+const manifest = JSON.parse(fs.readFileSync(path.join(html_dir, 'dictionary', 'manifest.json'), 'utf8'));
+
+function load(needed, dictionary) {
+    for (let ix = 0; ix < needed.length; ix++) {
+        const [language, word] = needed[ix];
+        const prefix = ladino.shard_prefix(word);
+        if (manifest['shards'][language].includes(prefix)) {
+            const shard = fs.readFileSync(path.join(html_dir, 'dictionary', language, `${prefix}.json`), 'utf8');
+            Object.assign(dictionary[language], JSON.parse(shard));
+        }
+    }
+}
+
+const languages = ['rashi', 'inglez', 'kasteyano', 'turko', 'fransez', 'ebreo', 'portugez'];
+let text = Object.keys(full).map(language => Object.keys(full[language]).join(' ')).join(' ');
+for (const original_language of ['automatik', 'ladino', 'inglez', 'kasteyano', 'turko', 'ebreo']) {
+    let dictionary = {};
+    for (const language in manifest['shards']) {
+        dictionary[language] = {};
+    }
+    const needed = ladino.source_shards(text + ' NotAWord', original_language, languages);
+    load(needed, dictionary);
+    load(ladino.ladino_shards(needed, dictionary), dictionary);
+    assert.deepStrictEqual(
+        ladino.translate(text, original_language, languages, dictionary),
+        ladino.translate(text, original_language, languages, full),
+    );
+}
+
+// The automatic translation with the table of all the languages, one shard per word.
+// In the browser search_key comes from search.js.
+global.search_key = require('.././ladino/js/search').search_key;
+let dictionary = {};
+for (const language in manifest['shards']) {
+    dictionary[language] = {};
+}
+const needed = ladino.any_shards(text + ' NotAWord');
+load(needed, dictionary);
+load(ladino.expand_any(needed, dictionary, languages), dictionary);
+assert.deepStrictEqual(
+    ladino.translate(text, 'automatik', languages, dictionary),
+    ladino.translate(text, 'automatik', languages, full),
+);